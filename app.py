@@ -28,13 +28,15 @@ from datetime import datetime, timedelta
 from functools import wraps
 
 # Import processors
-from processors.CustomDxfProcessor import CustomDxfProcessor
-from processors.VisualizationProcessor import VisualizationProcessor
+from processors.CustomDxfProcessor import DxfOptions, parse_dxf
+from processors.VisualizationProcessor import VisualizationProcessor, PLOT_LOCK
 from processors.RoomClusterProcessor import RoomClusterProcessor
 from processors.TileProcessor import TileProcessor
 from processors.MatchingProcessor import MatchingProcessor
 from processors.ExportProcessor import ExportProcessor
 from processors.DataPreparationProcessor import DataPreparationProcessor
+from processors.RevisionProcessor import RevisionProcessor
+from processors.geometry_utils import normalize_orientation
 
 # Add these new imports
 from flask_sqlalchemy import SQLAlchemy
@@ -47,6 +49,8 @@ from models import db, User, Project, Room, TileConfig, OptimizationResult, Acti
 from db_bridge import db_bridge
 from services.project_manager import ProjectManager
 from services.session_data_manager import SessionDataManager
+from services.dxf_cache import DxfCache
+from services.tile_cache import TileCache
 
 # Define the NumpyEncoder class first
 class NumpyEncoder(json.JSONEncoder):
@@ -119,14 +123,52 @@ def admin_required(f):
 app.config['UPLOAD_FOLDER'] = 'uploads'
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Low-memory DXF ingestion: stream only the room and SP layers (opt-in)
+app.config['DXF_STREAMING'] = os.environ.get('DXF_STREAMING', 'false').lower() == 'true'
+
+# Room clustering: 'dbscan' (centroid distance) or 'adjacency' (rooms sharing a wall)
+app.config['ROOM_CLUSTER_METHOD'] = os.environ.get('ROOM_CLUSTER_METHOD', 'dbscan').lower()
+# Worker processes for tiling rooms in step 3 (1 = serial, 0 = one per CPU core)
+app.config['TILE_WORKERS'] = int(os.environ.get('TILE_WORKERS', '1')) or (os.cpu_count() or 1)
+# Tile clipping: 'analytic' (interval arithmetic for rectilinear rooms), 'vectorized' or 'loop'
+app.config['TILE_ENGINE'] = os.environ.get('TILE_ENGINE', 'analytic').lower()
+# Repeated rooms are tiled once: 'translate' (copies), 'mirror' (also mirrored copies, no stagger) or 'off'
+app.config['TILE_DEDUP'] = os.environ.get('TILE_DEDUP', 'translate').lower()
+
+# Minimum empty gap (mm) between floor plates drawn side by side in one DXF
+app.config['LEVEL_GAP'] = float(os.environ.get('LEVEL_GAP', '10000'))
+
+# DBSCAN radius in mm, or 'auto' to pick it from the room distance curve
+ROOM_CLUSTER_EPS = os.environ.get('ROOM_CLUSTER_EPS', '7500').lower()
+app.config['ROOM_CLUSTER_EPS'] = ROOM_CLUSTER_EPS if ROOM_CLUSTER_EPS == 'auto' else float(ROOM_CLUSTER_EPS)
+
+# Parsed DXF results, keyed by file hash + extraction parameters
+app.config['DXF_CACHE_FOLDER'] = os.path.join('cache', 'dxf')
+
+# Room tilings per project, keyed by room geometry + layout settings (LRU, max rooms per project)
+app.config['TILE_CACHE_FOLDER'] = os.path.join('cache', 'tiles')
+app.config['TILE_CACHE_SIZE'] = int(os.environ.get('TILE_CACHE_SIZE', '2000'))
+
+# Layers and tolerances used by step 1 (part of the DXF cache key)
+DXF_OPTIONS = DxfOptions(
+    room_layer='Tile Layout',
+    sp_layer='SP',
+    snap_tol=1e-2,
+    heal_tol=5.0,
+    chord_tol=1.0,  # Max deviation when flattening arcs, circles and splines (mm)
+    streaming=app.config['DXF_STREAMING']
+)
+
 # Initialize processors as global objects
-dxf_processor = CustomDxfProcessor()
-cluster_processor = RoomClusterProcessor(eps=7500, min_samples=1)
+# (DXF parsing and room clustering keep per-upload state, so step 1 creates its own)
 visualizer = VisualizationProcessor()
-tile_processor = TileProcessor()
+tile_processor = TileProcessor(engine=app.config['TILE_ENGINE'], workers=app.config['TILE_WORKERS'],
+                               dedup=app.config['TILE_DEDUP'])
 matching_processor = MatchingProcessor()
 export_processor = ExportProcessor()
 data_prep_processor = DataPreparationProcessor()
+revision_processor = RevisionProcessor()
+dxf_cache = DxfCache(app.config['DXF_CACHE_FOLDER'])
 
 def check_credentials(username, password):
     """Check if username/password combination is valid using database"""
@@ -362,6 +404,7 @@ def clear_project_data_only():
             if not project.is_complete:
                 db.session.delete(project)  # This will cascade delete rooms, configs, etc.
                 db.session.commit()
+                TileCache(app.config['TILE_CACHE_FOLDER'], project_id).clear()
                 
                 # Update user dashboard statistics
                 try:
@@ -399,6 +442,7 @@ def cleanup_abandoned_projects():
         
         for project in old_projects:
             db.session.delete(project)
+            TileCache(app.config['TILE_CACHE_FOLDER'], project.id).clear()
             print(f"Cleaned up abandoned project: {project.id}")
         
         if old_projects:
@@ -794,6 +838,9 @@ def step1():
         
         print(f"Processing DXF for project: {project.project_name}")
         
+        # Revision mode: match against the rooms of the previous upload instead of starting over
+        revision_mode = request.form.get('revision_mode') == 'true'
+        
         # Check if the post request has the file part
         if 'dxf_file' not in request.files:
             return jsonify({'error': 'No file part'})
@@ -803,7 +850,8 @@ def step1():
             return jsonify({'error': 'No selected file'})
         
         # Save the file
-        filename = secure_filename(file.filename)
+        # Prefix with the project id so concurrent uploads of the same file name don't collide
+        filename = f"{project.id}_{secure_filename(file.filename)}"
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         
@@ -812,29 +860,35 @@ def step1():
             # Use the existing project (don't create a new one)
             print(f"Using existing project: {project.project_name} (ID: {project.id})")
             
-            # Set the file path in the processor
-            dxf_processor.file_path = filepath
-            
-            # Load the DXF file
-            if not dxf_processor.load_dxf():
-                # Clean up file if processing failed
-                cleanup_current_uploaded_file()
-                return jsonify({'error': 'Failed to load DXF file'})
-            
-            # Calculate file hash for duplicate detection
-            import hashlib
+            # Calculate file hash for duplicate detection and the parsed DXF cache
+            md5_hash = hashlib.md5()
             with open(filepath, 'rb') as f:
-                file_hash = hashlib.md5(f.read()).hexdigest()
+                for byte_block in iter(lambda: f.read(1024 * 1024), b""):
+                    md5_hash.update(byte_block)
+            file_hash = md5_hash.hexdigest()
             project.dxf_file_hash = file_hash
             
-            # Extract room boundaries
-            rooms = dxf_processor.extract_room_boundaries()
-            
-            # Extract start points
-            start_points = dxf_processor.extract_start_points()
-            
-            # Extract tile sizes from SP layer
-            tile_sizes = dxf_processor.extract_tile_sizes_from_sp(layer_name="SP")
+            cached = dxf_cache.get(file_hash, DXF_OPTIONS.cache_params())
+            if cached:
+                # Same drawing and settings as an earlier upload - skip parsing
+                rooms = cached['rooms']
+                start_points = cached['start_points']
+                tile_sizes = cached['tile_sizes']
+                sp_report = cached['meta'].get('sp_assignment_report', {'unassigned': [], 'ambiguous': {}})
+            else:
+                # Load the DXF and extract rooms, start points and tile sizes
+                extraction = parse_dxf(filepath, DXF_OPTIONS)
+                if extraction is None:
+                    # Clean up file if processing failed
+                    cleanup_current_uploaded_file(filepath)
+                    return jsonify({'error': 'Failed to load DXF file'})
+                
+                rooms = extraction.rooms
+                start_points = extraction.start_points
+                tile_sizes = extraction.tile_sizes
+                sp_report = extraction.sp_assignment_report
+                dxf_cache.put(file_hash, DXF_OPTIONS.cache_params(), rooms, start_points, tile_sizes,
+                              meta={'sp_assignment_report': sp_report})
             
             # Create initial dataframe for room boundaries
             room_data = []
@@ -868,9 +922,14 @@ def step1():
             room_plot_b64 = visualizer.plot_room_boundaries(rooms, start_points)
             
             # Cluster rooms into apartments
+            cluster_processor = RoomClusterProcessor(eps=app.config['ROOM_CLUSTER_EPS'], min_samples=1,
+                                                     method=app.config['ROOM_CLUSTER_METHOD'])
             room_df = cluster_processor.cluster_rooms(room_df['polygon'].tolist())
             apartment_names = cluster_processor.assign_default_names()
             
+            # Tag rooms with the floor plate they belong to (towers have several per drawing)
+            room_df = cluster_processor.assign_levels(app.config['LEVEL_GAP'])
+            
             # Preview clustering results
             cluster_processor.preview_clusters()
             
@@ -883,6 +942,41 @@ def step1():
                 lambda x: f"A{x+1}"
             )
             
+            # Revised drawing: carry names, orientations and tiles of matching rooms forward
+            revision_summary = None
+            revision_reuse = None
+            carried_orientations = None
+            if revision_mode:
+                previous = get_previous_upload_data(project)
+                if previous['polygons']:
+                    diff_df = revision_processor.diff_rooms(previous['polygons'], rooms)
+                    revision_summary = revision_processor.summarize(diff_df)
+                    final_room_df = revision_processor.carry_forward_names(
+                        diff_df, previous['room_df'], final_room_df
+                    )
+                    
+                    # Orientations of apartments that still exist (new apartments default to 0)
+                    old_orientations = {o['apartment_name']: o['orientation'] for o in previous['apartment_orientations']}
+                    carried_orientations = [
+                        {'apartment_name': apt_name, 'orientation': old_orientations.get(apt_name, 0)}
+                        for apt_name in final_room_df['apartment_name'].unique()
+                    ]
+                    
+                    # Tiles of unchanged rooms, reusable in step 3 if the tile settings match
+                    if previous['apartments_data'] and previous['tile_config']:
+                        reuse_tiles = revision_processor.reusable_tiles(
+                            diff_df, previous['apartments_data'], previous['start_points'], start_points
+                        )
+                        revision_reuse = {
+                            'tile_config': previous['tile_config'],
+                            'rooms': {str(room_id): entry for room_id, entry in reuse_tiles.items()}
+                        }
+                    
+                    apartment_names = {apt_name: group['room_name'].tolist()
+                                       for apt_name, group in final_room_df.groupby('apartment_name')}
+                else:
+                    print("No previous rooms found - processing as a new upload")
+            
             # Clear existing rooms for this project (in case of re-upload)
             Room.query.filter_by(project_id=project.id).delete()
             
@@ -896,7 +990,7 @@ def step1():
                 
                 room_obj = Room(
                     project_id=project.id,
-                    room_name=f"Room_{idx}",  # Will be updated in step 2
+                    room_name=row['room_name'] if revision_summary else f"Room_{idx}",  # Will be updated in step 2
                     apartment_name=row['apartment_name'],
                     polygon_json=json.dumps(serialize_polygon(row['polygon'])),
                     area=room_area,  # Use converted area
@@ -945,13 +1039,32 @@ def step1():
             session['cluster_plot'] = cluster_plot_b64
             session['room_df'] = final_room_df.drop('polygon', axis=1).to_dict('records')
             session['room_polygons'] = serialize_rooms(final_room_df['polygon'].tolist())
+            if carried_orientations is not None:
+                session['apartment_orientations'] = carried_orientations
+            if revision_reuse:
+                session['revision_reuse'] = revision_reuse
+            else:
+                session.pop('revision_reuse', None)
+            # Start point shifts belong to the previous drawing's room ids
+            session.pop('start_offsets', None)
+            # Cached distances let /step1/recluster try other eps values without re-parsing
+            if cluster_processor.distance_analysis:
+                session['cluster_analysis'] = dict(cluster_processor.distance_analysis,
+                                                   eps=cluster_processor.eps)
+            else:
+                session.pop('cluster_analysis', None)
             
             # Return results
             return jsonify({
                 'room_count': len(rooms),
                 'apartment_count': len(apartment_names),
+                'level_count': int(final_room_df['level'].nunique()),
                 'start_point_count': len(start_points),
+                'unassigned_start_points': sp_report['unassigned'],
+                'ambiguous_start_points': {str(k): v for k, v in sp_report['ambiguous'].items()},
                 'tile_sizes': tile_sizes,
+                'revision_summary': revision_summary,
+                'cluster_eps': session.get('cluster_analysis', {}).get('eps'),
                 'room_plot': room_plot_b64,
                 'cluster_plot': cluster_plot_b64,
                 'project_id': project.id,  # Include project ID in response
@@ -960,11 +1073,76 @@ def step1():
             
         except Exception as e:
             # Clean up file if there was an error
-            cleanup_current_uploaded_file()
+            cleanup_current_uploaded_file(filepath)
             import traceback
             traceback.print_exc()
             return jsonify({'error': f'Error processing DXF file: {str(e)}'})
 
+@app.route('/step1/recluster', methods=['POST'])
+@login_required
+def step1_recluster():
+    """Re-split rooms into apartments with another eps, using the distances cached in step 1"""
+    data = request.get_json() or {}
+    
+    if 'project_id' not in session:
+        return jsonify({'error': 'No active project. Please create a project first.'})
+    
+    project = Project.query.get(session['project_id'])
+    if not project:
+        return jsonify({'error': 'Project not found. Please create a new project.'})
+    
+    analysis = session.get('cluster_analysis')
+    room_df = pd.DataFrame(session.get('room_df', []))
+    if not analysis or room_df.empty:
+        return jsonify({'error': 'No cached room distances. Please process a DXF file first.'})
+    
+    try:
+        cluster_processor = RoomClusterProcessor(min_samples=analysis['min_samples'])
+        eps = analysis['knee_eps'] if data.get('eps') == 'auto' else float(data.get('eps', analysis['eps']))
+        if not eps or eps <= 0:
+            return jsonify({'error': 'eps must be a positive distance in mm'})
+        
+        # Re-cluster from the cached distances and reset to default names
+        room_df = room_df.sort_values('room_id').reset_index(drop=True)
+        room_df['apartment_cluster'] = cluster_processor.recluster(eps, analysis)
+        room_df['apartment_name'] = room_df['apartment_cluster'].apply(lambda x: f"A{x+1}")
+        room_df['room_name'] = room_df['apartment_name'] + '-R' + \
+            (room_df.groupby('apartment_cluster').cumcount() + 1).astype(str)
+        apartment_count = int(room_df['apartment_cluster'].nunique())
+        
+        # Keep the saved rooms in step with the new split (Room rows are in room_id order)
+        for room_obj, apt_name in zip(Room.query.filter_by(project_id=project.id).order_by(Room.id).all(),
+                                      room_df['apartment_name']):
+            room_obj.apartment_name = apt_name
+        project.num_apartments = apartment_count
+        project.updated_at = datetime.utcnow()
+        db.session.commit()
+        
+        session['room_df'] = room_df.to_dict('records')
+        session['cluster_analysis'] = dict(analysis, eps=eps)
+        session.pop('apartment_orientations', None)
+        
+        # The plot is optional so a slider can re-cluster without waiting for matplotlib
+        cluster_plot_b64 = None
+        if data.get('plot', True):
+            plot_df = room_df.copy()
+            plot_df['polygon'] = deserialize_rooms(session.get('room_polygons', []))
+            cluster_plot_b64 = visualizer.plot_clusters(plot_df, use_final_names=False)
+            session['cluster_plot'] = cluster_plot_b64
+        
+        return jsonify({
+            'success': True,
+            'eps': eps,
+            'knee_eps': analysis['knee_eps'],
+            'apartment_count': apartment_count,
+            'cluster_plot': cluster_plot_b64
+        })
+    
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'Error re-clustering rooms: {str(e)}'})
+
 @app.route('/step2', methods=['GET', 'POST'])
 @login_required
 def step2():
@@ -989,7 +1167,13 @@ def step2():
             for apt in data['apartments']:
                 original_name = apt['original_name']
                 new_name = apt['new_name']
-                orientation = apt.get('orientation', 0)
+                # Any tile angle in degrees, folded into [0, 180) (270 tiles like 90, 180 like 0);
+                # 'auto' is resolved to 0 or 90 when tiles are generated in step 3
+                orientation = apt.get('orientation', 0) or 0
+                if str(orientation).lower() == 'auto':
+                    orientation = 'auto'
+                else:
+                    orientation = normalize_orientation(orientation)
                 
                 # Store orientation data
                 orientation_data.append({
@@ -1086,6 +1270,9 @@ def step2():
             room_positions = []
         
         # Prepare data for template (existing form-based editing)
+        # Orientations already chosen (or carried over from a previous drawing) are preselected
+        saved_orientations = {o['apartment_name']: o['orientation']
+                              for o in session.get('apartment_orientations', [])}
         apartments = []
         for apt_name, group in room_df.groupby('apartment_name'):
             rooms = [
@@ -1098,6 +1285,7 @@ def step2():
             
             apartments.append({
                 'apartment_name': apt_name,
+                'orientation': saved_orientations.get(apt_name, 0),
                 'rooms': rooms
             })
         
@@ -1206,36 +1394,32 @@ def step3():
             if len(room_polygons) == len(room_df):
                 room_df['polygon'] = room_polygons
             
-            # Get tile configuration
-            use_default = data.get('use_default_size', True)
-            if not use_default:
-                tile_width = float(data.get('tile_width', 600))
-                tile_height = float(data.get('tile_height', 600))
-            else:
-                if start_points and len(start_points) > 0:
-                    sizes = [(sp['width'], sp['height']) for sp in start_points]
-                    most_common_size = max(set(sizes), key=sizes.count)
-                    tile_width, tile_height = most_common_size
-                elif tile_sizes:
-                    tile_width, tile_height = tile_sizes[0]
-                else:
-                    tile_width, tile_height = 600, 600
-            
-            # Get grout settings
-            sp_includes_grout = data.get('sp_includes_grout', True)
-            grout_thickness = float(data.get('grout_thickness', 3))
+            # Layout settings the tiles are generated with (also stored for later steps)
+            tile_config = build_tile_config(data, start_points, tile_sizes)
+            tile_width, tile_height = tile_config['tile_width'], tile_config['tile_height']
+            grout_thickness = tile_config['grout_thickness']
+            sp_includes_grout = tile_config['sp_includes_grout']
+            stagger_percent = tile_config['stagger_percent']
+            stagger_direction = tile_config['stagger_direction']
+            
+            # Apartments set to 'auto' in step 2 take the better of 0° and 90°
+            start_offsets = get_start_offsets()
+            apartment_orientations, orientation_scores = tile_processor.resolve_auto_orientations(
+                room_df, apartment_orientations, start_points, stagger_percent, stagger_direction,
+                grout_thickness, sp_includes_grout, tile_width, tile_height, start_offsets=start_offsets
+            )
             
-            # Get layout type
-            layout_type = data.get('layout_type', 'standard')
-            stagger_percent = 0
-            stagger_direction = 'x'
+            # Tiles of rooms unchanged by a drawing revision, if laid with the same settings
+            reuse_tiles = get_revision_reuse_tiles(tile_config, apartment_orientations, room_df)
             
-            if layout_type == 'staggered':
-                stagger_percent = float(data.get('stagger_percent', 0.5))
-                stagger_direction = data.get('stagger_direction', 'x')
+            # Rooms tiled before with the same geometry and settings come from the project's cache
+            tile_cache = None
+            if session.get('project_id') is not None:
+                tile_cache = TileCache(app.config['TILE_CACHE_FOLDER'], session['project_id'],
+                                       app.config['TILE_CACHE_SIZE'])
             
-            # Generate tiles for all rooms
-            apartments_data = tile_processor.generate_tiles_for_all_rooms(
+            # Generate tiles for all rooms, level by level
+            apartments_data = tile_processor.generate_tiles_by_level(
                 room_df, 
                 apartment_orientations, 
                 start_points,
@@ -1244,8 +1428,13 @@ def step3():
                 grout_thickness, 
                 sp_includes_grout,
                 tile_width,
-                tile_height
+                tile_height,
+                reuse_tiles=reuse_tiles,
+                start_offsets=start_offsets,
+                tile_cache=tile_cache
             )
+            if tile_cache is not None:
+                tile_cache.save()
             
             # Verify room coverage
             coverage_df = tile_processor.verify_room_coverage(apartments_data, room_df)
@@ -1259,15 +1448,7 @@ def step3():
             # Store tile data in session
             session['apartments_data'] = serialize_apartments_data(apartments_data)
             session['final_room_df'] = room_df.to_dict('records')
-            session['tile_config'] = {
-                'tile_width': tile_width,
-                'tile_height': tile_height,
-                'grout_thickness': grout_thickness,
-                'sp_includes_grout': sp_includes_grout,
-                'stagger_percent': stagger_percent,
-                'stagger_direction': stagger_direction,
-                'layout_type': layout_type
-            }
+            session['tile_config'] = tile_config
             
             # Summary statistics
             total_tiles = sum(len(apt_data['tiles']) for apt_data in apartments_data.values())
@@ -1289,7 +1470,31 @@ def step3():
                     'grout_thickness': f"{grout_thickness}mm",
                     'layout_type': 'Staggered' if stagger_percent > 0 else 'Standard',
                     'low_coverage_rooms': len(low_coverage)
-                }
+                },
+                # Uncovered areas of poorly covered rooms, as bounding boxes (mm)
+                'coverage_gaps': [
+                    {
+                        'room_id': int(row['room_id']),
+                        'room_name': row['room_name'],
+                        'gap_area': round(float(row['gap_area']), 1),
+                        'gap_bounds': [list(gap.bounds) for gap in row['gaps']]
+                    }
+                    for _, row in low_coverage.iterrows()
+                ],
+                # Both candidates of every 'auto' apartment, with the pick marked
+                'orientation_scores': [
+                    {
+                        'apartment_name': row['apartment_name'],
+                        'orientation': int(row['orientation']),
+                        'rooms': int(row['rooms']),
+                        'cut_tiles': int(row['cut_tiles']),
+                        'under_half_tiles': int(row['under_half_tiles']),
+                        'sliver_tiles': int(row['sliver_tiles']),
+                        'waste_m2': round(float(row['waste_m2']), 3),
+                        'chosen': bool(row['chosen'])
+                    }
+                    for _, row in orientation_scores.iterrows()
+                ]
             })
         
         except Exception as e:
@@ -1325,6 +1530,85 @@ def step3():
         print(f"Error in step3 GET: {str(e)}")
         return redirect(url_for('step2'))
 
+@app.route('/step3/optimize_offsets', methods=['POST'])
+@login_required
+def step3_optimize_offsets():
+    """Search start point offsets per room that reduce cuts, slivers and waste"""
+    data = request.get_json() or {}
+    try:
+        start_points = deserialize_start_points(session.get('start_points_data', []))
+        apartment_orientations = pd.DataFrame(session.get('apartment_orientations', []))
+        room_df = pd.DataFrame(session.get('room_df', []))
+        room_polygons = deserialize_rooms(session.get('room_polygons', []))
+        
+        if room_df.empty or apartment_orientations.empty or len(room_polygons) != len(room_df):
+            return jsonify({'error': 'Missing required data. Please complete previous steps first.'})
+        room_df['polygon'] = room_polygons
+        
+        tile_config = build_tile_config(data, start_points, session.get('tile_sizes', []))
+        apartment_orientations, _ = tile_processor.resolve_auto_orientations(
+            room_df, apartment_orientations, start_points,
+            tile_config['stagger_percent'], tile_config['stagger_direction'],
+            tile_config['grout_thickness'], tile_config['sp_includes_grout'],
+            tile_config['tile_width'], tile_config['tile_height'], start_offsets=get_start_offsets()
+        )
+        results = tile_processor.optimize_start_offsets(
+            room_df, apartment_orientations, start_points,
+            tile_config['stagger_percent'], tile_config['stagger_direction'],
+            tile_config['grout_thickness'], tile_config['sp_includes_grout'],
+            tile_config['tile_width'], tile_config['tile_height'],
+            steps=int(data.get('steps', 40))
+        )
+        
+        def rounded(metrics):
+            return {
+                'dx': round(float(metrics['dx']), 3),
+                'dy': round(float(metrics['dy']), 3),
+                'tiles': int(metrics['tiles']),
+                'cut_tiles': int(metrics['cut_tiles']),
+                'sliver_tiles': int(metrics['sliver_tiles']),
+                'waste_m2': round(float(metrics['waste_m2']), 3)
+            }
+        
+        adopted = get_start_offsets()
+        rooms = []
+        for _, room in room_df.iterrows():
+            result = results[room['room_id']]
+            rooms.append({
+                'room_id': int(room['room_id']),
+                'room_name': room.get('room_name', f"Room {room['room_id']}"),
+                'apartment_name': room['apartment_name'],
+                'adopted': list(adopted.get(int(room['room_id']), (0, 0))),
+                'current': rounded(result['current']),
+                'options': [rounded(option) for option in result['options']]
+            })
+        
+        return jsonify({'success': True, 'rooms': rooms})
+    
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'Error searching start point offsets: {str(e)}'})
+
+@app.route('/step3/adopt_offsets', methods=['POST'])
+@login_required
+def step3_adopt_offsets():
+    """Store start point shifts (mm) to apply the next time tiles are generated"""
+    data = request.get_json() or {}
+    offsets = get_start_offsets()
+    for entry in data.get('offsets', []):
+        room_id = int(entry['room_id'])
+        dx, dy = float(entry.get('dx', 0)), float(entry.get('dy', 0))
+        # A zero shift means "back to the drawn start point"
+        if dx == 0 and dy == 0:
+            offsets.pop(room_id, None)
+        else:
+            offsets[room_id] = (dx, dy)
+    
+    session['start_offsets'] = [{'room_id': room_id, 'dx': dx, 'dy': dy}
+                                for room_id, (dx, dy) in sorted(offsets.items())]
+    return jsonify({'success': True, 'adopted': len(offsets)})
+
 @app.route('/step4', methods=['GET', 'POST'])
 @login_required
 def step4():
@@ -1539,10 +1823,12 @@ def step5():
                         else:
                             tiles_df.at[idx, 'actual_height'] = tile.get('height', 600)
             
-            # Create visualization
-            classification_counts = visualizer.visualize_classification(
-                tiles_df, final_room_df, has_pattern, with_grout=True
-            )
+            # Create visualization (saved while holding the plot lock, the figure is pyplot's current one)
+            with PLOT_LOCK:
+                classification_counts = visualizer.visualize_classification(
+                    tiles_df, final_room_df, has_pattern, with_grout=True
+                )
+                classification_plot = plt_to_base64()
             
             # Store classification data in session
             tile_classification_results = {
@@ -1565,7 +1851,7 @@ def step5():
             # Prepare response
             response_data = {
                 'success': True,
-                'classification_plot': plt_to_base64(),
+                'classification_plot': classification_plot,
                 'summary': {
                     'pattern_mode': 'Yes (X/Y separation)' if has_pattern else 'No (all cuts combined)',
                     'grout_thickness': f"{stats['grout_thickness']}mm",
@@ -1664,9 +1950,9 @@ def step6():
             # Create visualization if small tiles found
             visualization_plot = None
             if total_small_tiles > 0:
-                visualization_plot = visualizer.visualize_small_tiles(
-                    tiles_df, all_small_tiles, final_room_df, size_threshold
-                )
+                with PLOT_LOCK:
+                    if visualizer.visualize_small_tiles(tiles_df, all_small_tiles, final_room_df, size_threshold):
+                        visualization_plot = plt_to_base64()
                 
                 # Handle exclusion if requested
                 if exclude_small_tiles:
@@ -1705,7 +1991,7 @@ def step6():
             # Prepare response
             response_data = {
                 'success': True,
-                'visualization_plot': plt_to_base64() if visualization_plot else None,
+                'visualization_plot': visualization_plot,
                 'summary': {
                     'total_small_tiles': total_small_tiles,
                     'irregular_tiles_area': small_irregular_count,
@@ -2404,22 +2690,23 @@ def visualize_apartment():
         # Create group mapping following Colab exactly
         group_mapping, tile_specs_to_groups = matching_processor.create_group_based_tile_mapping(clean_tables)
               
-        # Call the visualizer method following Colab Step 9
-        match_type_counts = visualizer.visualize_apartment_tiles(
-            apartment_name, 
-            apt_tiles, 
-            apt_rooms, 
-            group_mapping, 
-            tile_specs_to_groups, 
-            tile_width, 
-            tile_height,
-            matching_processor.get_tile_color_group_based
-        )
-        
-        # Convert plot to base64
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight', dpi=150)
-        plt.close()
+        # Call the visualizer method following Colab Step 9 and save its figure under the plot lock
+        with PLOT_LOCK:
+            match_type_counts = visualizer.visualize_apartment_tiles(
+                apartment_name, 
+                apt_tiles, 
+                apt_rooms, 
+                group_mapping, 
+                tile_specs_to_groups, 
+                tile_width, 
+                tile_height,
+                matching_processor.get_tile_color_group_based
+            )
+            
+            # Convert plot to base64
+            buf = io.BytesIO()
+            plt.savefig(buf, format='png', bbox_inches='tight', dpi=150)
+            plt.close()
         buf.seek(0)
         plot_base64 = base64.b64encode(buf.read()).decode('utf-8')
         
@@ -2580,9 +2867,12 @@ def step9():
                 with pd.ExcelWriter(master_filename, engine='openpyxl') as writer:
                     # EXISTING SHEETS - Keep your current summary sheets
                     # Summary sheet
+                    levels_room_df = pd.DataFrame(session.get('final_room_df', []))
+                    apartment_levels = export_processor.get_apartment_levels(levels_room_df)
                     summary_data = []
                     for apt, summary in apartment_summaries.items():
                         summary_data.append({
+                            'Level': apartment_levels.get(apt, 'Level 0'),
                             'Apartment': apt,
                             'Total Pieces': summary['total_pieces'],
                             'Matched': summary['matched_pieces'],
@@ -2592,7 +2882,10 @@ def step9():
                             'Inventory Matches': summary['inventory_matches']
                         })
                     
-                    summary_df = pd.DataFrame(summary_data)
+                    summary_df = export_processor.sort_by_level(
+                        pd.DataFrame(summary_data), 'Apartment',
+                        export_processor.get_apartment_level_indexes(levels_room_df)
+                    )
                     summary_df.to_excel(writer, sheet_name='1. Matching Summary', index=False)
                     
                     # Matching info sheet
@@ -2705,18 +2998,17 @@ def step9():
                             if tile_idx in tile_polygon_map:
                                 apt_tiles.at[idx, 'polygon'] = tile_polygon_map[tile_idx]
                     
-                    # Create visualization
-                    summary = visualizer.visualize_apartment_tiles(
-                        apartment_name, apt_tiles, apt_rooms, 
-                        group_mapping, tile_specs_to_groups, 
-                        tile_width, tile_height,
-                        matching_processor.get_tile_color_group_based
-                    )
-                    
-                    # Save figure
+                    # Create visualization and save the figure under the plot lock
                     visual_file = os.path.join(visual_dir, f"{apartment_name}_visual_report.png")
-                    plt.savefig(visual_file, dpi=300, bbox_inches='tight')
-                    plt.close()
+                    with PLOT_LOCK:
+                        summary = visualizer.visualize_apartment_tiles(
+                            apartment_name, apt_tiles, apt_rooms, 
+                            group_mapping, tile_specs_to_groups, 
+                            tile_width, tile_height,
+                            matching_processor.get_tile_color_group_based
+                        )
+                        plt.savefig(visual_file, dpi=300, bbox_inches='tight')
+                        plt.close()
                     
                     created_files.append(visual_file)
             
@@ -2783,19 +3075,21 @@ def step9():
 def plt_to_base64():
     """Convert current matplotlib plot to base64 string"""
     buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    plt.close()
+    with PLOT_LOCK:
+        plt.savefig(buf, format='png')
+        plt.close()
     buf.seek(0)
     return base64.b64encode(buf.read()).decode('utf-8')
 
 def generate_placeholder_image(title, width=800, height=600):
     """Generate a placeholder image with a title"""
-    plt.figure(figsize=(width/100, height/100), dpi=100)
-    plt.text(0.5, 0.5, title, ha='center', va='center', fontsize=24)
-    plt.axis('off')
-    plt.tight_layout()
-    
-    return plt_to_base64()
+    with PLOT_LOCK:
+        plt.figure(figsize=(width/100, height/100), dpi=100)
+        plt.text(0.5, 0.5, title, ha='center', va='center', fontsize=24)
+        plt.axis('off')
+        plt.tight_layout()
+        
+        return plt_to_base64()
 
 def serialize_polygon(polygon):
     """Serialize a Shapely polygon to a JSON-compatible format"""
@@ -2803,9 +3097,94 @@ def serialize_polygon(polygon):
         return None
     return {
         'type': 'Polygon',
-        'coordinates': [list(polygon.exterior.coords)]
+        'coordinates': [list(polygon.exterior.coords)] + [list(interior.coords) for interior in polygon.interiors]
+    }
+
+def get_previous_upload_data(project):
+    """Rooms, names, start points and tiles of the project's previous DXF upload"""
+    stored_data = {}
+    for step in (1, 2, 3):
+        stored_data.update(getattr(project, f'step{step}_session_data', None) or {})
+    
+    def previous(key, default):
+        return session.get(key) or stored_data.get(key) or default
+    
+    # Room ids are the order in which the rooms were saved
+    polygons = []
+    for room in Room.query.filter_by(project_id=project.id).order_by(Room.id).all():
+        if room.polygon_json:
+            rings = json.loads(room.polygon_json)['coordinates']
+            polygons.append(Polygon(rings[0], rings[1:]))
+    
+    return {
+        'polygons': polygons,
+        'room_df': pd.DataFrame(previous('room_df', [])),
+        'start_points': previous('start_points_data', []),
+        'apartment_orientations': previous('apartment_orientations', []),
+        'apartments_data': previous('apartments_data', {}),
+        'tile_config': previous('tile_config', None)
     }
 
+def build_tile_config(data, start_points, tile_sizes):
+    """Tile layout settings from a step 3 form submission"""
+    use_default = data.get('use_default_size', True)
+    if not use_default:
+        tile_width = float(data.get('tile_width', 600))
+        tile_height = float(data.get('tile_height', 600))
+    else:
+        if start_points and len(start_points) > 0:
+            sizes = [(sp['width'], sp['height']) for sp in start_points]
+            most_common_size = max(set(sizes), key=sizes.count)
+            tile_width, tile_height = most_common_size
+        elif tile_sizes:
+            tile_width, tile_height = tile_sizes[0]
+        else:
+            tile_width, tile_height = 600, 600
+    
+    # Get layout type
+    layout_type = data.get('layout_type', 'standard')
+    stagger_percent = 0
+    stagger_direction = 'x'
+    
+    if layout_type == 'staggered':
+        stagger_percent = float(data.get('stagger_percent', 0.5))
+        stagger_direction = data.get('stagger_direction', 'x')
+    
+    return {
+        'tile_width': tile_width,
+        'tile_height': tile_height,
+        'grout_thickness': float(data.get('grout_thickness', 3)),
+        'sp_includes_grout': data.get('sp_includes_grout', True),
+        'stagger_percent': stagger_percent,
+        'stagger_direction': stagger_direction,
+        'layout_type': layout_type
+    }
+
+def get_start_offsets():
+    """Adopted start point shifts as {room_id: (dx, dy)}"""
+    return {int(o['room_id']): (o['dx'], o['dy']) for o in session.get('start_offsets', [])}
+
+def get_revision_reuse_tiles(tile_config, apartment_orientations, room_df):
+    """Deserialized tiles per room_id that step 1 marked reusable after a drawing revision"""
+    revision_reuse = session.get('revision_reuse')
+    if not revision_reuse or revision_reuse.get('tile_config') != tile_config:
+        return None
+    
+    orientations = dict(zip(apartment_orientations['apartment_name'], apartment_orientations['orientation']))
+    room_apartments = dict(zip(room_df['room_id'], room_df['apartment_name']))
+    
+    reuse_tiles = {}
+    for room_id, entry in revision_reuse.get('rooms', {}).items():
+        room_id = int(room_id)
+        # The apartment may have been re-oriented in step 2 since the tiles were laid
+        if orientations.get(room_apartments.get(room_id)) != entry['orientation']:
+            continue
+        restored = deserialize_apartments_data({'reuse': {'orientation': entry['orientation'], 'tiles': entry['tiles']}})
+        reuse_tiles[room_id] = restored['reuse']['tiles']
+    
+    print(f"♻️ Reusing tiles of {len(reuse_tiles)} unchanged rooms")
+    return reuse_tiles
+
 def is_room_rectangular(polygon):
     """Check if a room is rectangular (4 vertices and all right angles)"""
     coords = list(polygon.exterior.coords)[:-1]  # Remove duplicate last coordinate
@@ -2835,10 +3214,14 @@ def serialize_rooms(rooms):
     serialized_rooms = []
     for room in rooms:
         coords = list(room.exterior.coords)
-        serialized_rooms.append({
+        serialized_room = {
             'coords': coords,
             'bounds': room.bounds
-        })
+        }
+        # Holes (columns, shafts) detected during face extraction
+        if len(room.interiors) > 0:
+            serialized_room['interiors'] = [list(interior.coords) for interior in room.interiors]
+        serialized_rooms.append(serialized_room)
     return serialized_rooms
 
 def serialize_start_points(start_points):
@@ -2859,7 +3242,7 @@ def deserialize_rooms(serialized_rooms):
     """Convert serialized room data back to Shapely polygons"""
     rooms = []
     for room_data in serialized_rooms:
-        poly = Polygon(room_data['coords'])
+        poly = Polygon(room_data['coords'], room_data.get('interiors'))
         rooms.append(poly)
     return rooms
 
@@ -3108,9 +3491,15 @@ def cleanup_all_uploaded_files():
     except Exception as e:
         print(f"Error cleaning up upload folder: {e}")
 
-def cleanup_current_uploaded_file():
-    """Remove the most recently uploaded DXF file"""
+def cleanup_current_uploaded_file(filepath=None):
+    """Remove the given uploaded DXF file, or the most recently uploaded one"""
     try:
+        if filepath:
+            if os.path.isfile(filepath):
+                os.remove(filepath)
+                print(f"Removed current project file: {os.path.basename(filepath)}")
+            return
+        
         upload_folder = app.config.get('UPLOAD_FOLDER', 'uploads')
         if os.path.exists(upload_folder):
             # Get the most recent file
@@ -3,21 +3,90 @@
 import ezdxf
 import numpy as np
 import matplotlib.pyplot as plt
-from shapely.geometry import Polygon, Point, MultiPolygon, LineString
-from shapely.ops import unary_union
+from shapely.geometry import Polygon, Point, MultiPolygon, LineString, MultiLineString
+from shapely.ops import unary_union, polygonize
+from shapely.strtree import STRtree
+import shapely
+from scipy.spatial import cKDTree
 from collections import defaultdict
+from dataclasses import dataclass, field, asdict
 from sklearn.cluster import KMeans
+from ezdxf.addons import iterdxf
 import pandas as pd
 import math
 
+# Entity types understood by the extractors (used to filter the streaming reader)
+LINEWORK_TYPES = ('LINE', 'LWPOLYLINE', 'POLYLINE', 'ARC', 'CIRCLE', 'SPLINE', 'ELLIPSE')
+
+
+@dataclass(frozen=True)
+class DxfOptions:
+    """Layers and tolerances for parse_dxf"""
+    room_layer: str = "Tile Layout"
+    sp_layer: str = "SP"
+    snap_tol: float = 1e-2
+    heal_tol: float = 5.0
+    chord_tol: float = 1.0
+    streaming: bool = False
+
+    def cache_params(self):
+        """Parameters that affect the extracted geometry (including the reading mode)"""
+        return asdict(self)
+
+
+@dataclass
+class DxfExtraction:
+    """Everything step 1 needs from a DXF file"""
+    rooms: list = field(default_factory=list)
+    start_points: list = field(default_factory=list)
+    tile_sizes: list = field(default_factory=list)
+    layers: list = field(default_factory=list)
+    healing_stats: dict = field(default_factory=dict)
+    sp_assignment_report: dict = field(default_factory=lambda: {'unassigned': [], 'ambiguous': {}})
+
+
+def parse_dxf(path, options=None):
+    """Parse a DXF file into a DxfExtraction, or None if the file cannot be loaded.
+
+    Every call works on its own CustomDxfProcessor, so concurrent calls share no
+    mutable state and can run in parallel threads.
+    """
+    options = options or DxfOptions()
+    processor = CustomDxfProcessor(path, streaming=options.streaming,
+                                   stream_layers=(options.room_layer, options.sp_layer))
+    if not processor.load_dxf():
+        return None
+
+    rooms = processor.extract_room_boundaries(options.room_layer, snap_tol=options.snap_tol,
+                                              heal_tol=options.heal_tol, chord_tol=options.chord_tol)
+    start_points = processor.extract_start_points(options.sp_layer)
+    tile_sizes = processor.extract_tile_sizes_from_sp(layer_name=options.sp_layer)
+
+    return DxfExtraction(
+        rooms=rooms,
+        start_points=start_points,
+        tile_sizes=tile_sizes,
+        layers=processor.list_all_layers(),
+        healing_stats=processor.healing_stats,
+        sp_assignment_report=processor.sp_assignment_report
+    )
+
+
 class CustomDxfProcessor:
-    def __init__(self, file_path=None):
+    def __init__(self, file_path=None, streaming=False, stream_layers=("Tile Layout", "SP")):
         self.file_path = file_path
+        self.streaming = streaming
+        self.stream_layers = stream_layers
         self.doc = None
         self.room_polygons = []
         self.start_points = []
         self.sp_polygons = []
         self.tiles = []
+        self.healing_stats = {}
+        self.layer_index = None
+        self.start_points_layer = None
+        self.block_cache = {}
+        self.sp_assignment_report = {'unassigned': [], 'ambiguous': {}}
 
     def load_dxf(self):
         # Remove Google Colab specific code
@@ -26,54 +95,283 @@ class CustomDxfProcessor:
             return False
 
         try:
+            if self.streaming:
+                if self.stream_layer_index() is not None:
+                    print("✅ DXF file streamed successfully.")
+                    return True
+                # Block definitions are not streamed, so rooms drawn as blocks would be lost
+                print("⚠️ DXF contains block references (INSERT); streaming cannot expand them, "
+                      "loading the whole file instead")
             self.doc = ezdxf.readfile(self.file_path)
             print("✅ DXF file loaded successfully.")
+            self.build_layer_index()
             return True
         except Exception as e:
             print(f"❌ Error loading DXF file: {e}")
             return False
 
-    def list_all_layers(self):
-        if not self.doc:
-            if not self.load_dxf():
-                return []
-        layers = set()
+    def build_layer_index(self):
+        """Index modelspace entities by layer and entity type in a single pass"""
+        self.layer_index = defaultdict(lambda: defaultdict(list))
+        self.start_points_layer = None
+        self.block_cache = {}
+        entity_count = 0
         for entity in self.doc.modelspace():
             if hasattr(entity.dxf, 'layer'):
-                layers.add(entity.dxf.layer)
-        return sorted(list(layers))
+                self.layer_index[entity.dxf.layer][entity.dxftype()].append(entity)
+                entity_count += 1
+        print(f"🗂️ Indexed {entity_count} entities on {len(self.layer_index)} layers")
+        return self.layer_index
 
-    def collect_and_clean_linework(self, layer_name, tol=1e-2):
-        raw_lines = []
-        for entity in self.doc.modelspace():
-            if hasattr(entity.dxf, 'layer') and entity.dxf.layer.lower() == layer_name.lower():
-                if entity.dxftype() == 'LINE':
-                    a = (entity.dxf.start.x, entity.dxf.start.y)
-                    b = (entity.dxf.end.x, entity.dxf.end.y)
-                    raw_lines.append((a, b))
-                elif entity.dxftype() == 'LWPOLYLINE':
-                    pts = [(pt[0], pt[1]) for pt in entity.get_points()]
-                    if entity.closed:
-                        pts.append(pts[0])
-                    for i in range(len(pts) - 1):
-                        raw_lines.append((pts[i], pts[i+1]))
-                elif entity.dxftype() == 'POLYLINE':
-                    pts = [(v.dxf.location.x, v.dxf.location.y) for v in entity.vertices]
-                    if pts[0] != pts[-1]:
-                        pts.append(pts[0])
-                    for i in range(len(pts) - 1):
-                        raw_lines.append((pts[i], pts[i+1]))
+    def stream_layer_index(self):
+        """Build the layer index without loading the document (low-memory mode).
+
+        Modelspace entities are read one by one with ezdxf's iterative reader and
+        only those on self.stream_layers are kept; every other layer is recorded
+        by name only so list_all_layers still reports it. Blocks and the rest of
+        the document are never loaded, so rooms inside blocks cannot be expanded:
+        returns None as soon as a modelspace INSERT is found (the caller then
+        loads the whole file).
+        """
+        wanted = {name.lower() for name in self.stream_layers}
+        self.doc = None
+        self.layer_index = defaultdict(lambda: defaultdict(list))
+        self.start_points_layer = None
+        self.block_cache = {}
+        entity_count = 0
+        for entity in iterdxf.modelspace(self.file_path):
+            if not hasattr(entity.dxf, 'layer'):
+                continue
+            if entity.dxftype() == 'INSERT':
+                self.layer_index = None
+                return None
+            layer = entity.dxf.layer
+            layer_entities = self.layer_index[layer]
+            if layer.lower() in wanted and entity.dxftype() in LINEWORK_TYPES:
+                layer_entities[entity.dxftype()].append(entity)
+                entity_count += 1
+        print(f"🗂️ Streamed {entity_count} entities from layers {', '.join(self.stream_layers)}")
+        return self.layer_index
+
+    def get_layer_entities(self, layer_name, dxftypes=None, ignore_case=False):
+        """Return indexed entities on a layer, optionally limited to some entity types"""
+        if self.layer_index is None:
+            if not self.doc and not self.load_dxf():
+                return []
+            if self.layer_index is None:
+                self.build_layer_index()
+
+        if ignore_case:
+            layers = [name for name in self.layer_index if name.lower() == layer_name.lower()]
+        else:
+            layers = [layer_name] if layer_name in self.layer_index else []
+
+        entities = []
+        for name in layers:
+            for dxftype, type_entities in self.layer_index[name].items():
+                if dxftypes is None or dxftype in dxftypes:
+                    entities.extend(type_entities)
+        return entities
+
+    def list_all_layers(self):
+        if self.layer_index is None:
+            if not self.doc and not self.load_dxf():
+                return []
+            if self.layer_index is None:
+                self.build_layer_index()
+        return sorted(self.layer_index.keys())
+
+    def flatten_arcs(self, centers, radii, start_angles, sweeps, chord_tol=1.0):
+        """Flatten many circular arcs into line segments in one vectorised pass.
+
+        Angles are in radians, sweeps are signed (positive = counter-clockwise).
+        Each arc gets just enough chords to keep the sagitta within chord_tol.
+        Returns an (N, 2, 2) array of segments.
+        """
+        centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+        radii = np.asarray(radii, dtype=float)
+        start_angles = np.asarray(start_angles, dtype=float)
+        sweeps = np.asarray(sweeps, dtype=float)
+        if len(radii) == 0:
+            return np.empty((0, 2, 2))
+
+        # Max angle per chord for sagitta r * (1 - cos(step / 2)) <= chord_tol
+        ratio = np.clip(1.0 - chord_tol / np.maximum(radii, 1e-12), -1.0, 1.0)
+        max_step = np.maximum(2.0 * np.arccos(ratio), 1e-3)
+        counts = np.maximum(np.ceil(np.abs(sweeps) / max_step), 1).astype(int)
+
+        # Points of all arcs laid out back to back: arc k owns counts[k] + 1 points
+        arc_ids = np.repeat(np.arange(len(counts)), counts + 1)
+        starts = np.concatenate(([0], np.cumsum(counts + 1)[:-1]))
+        t = (np.arange(len(arc_ids)) - starts[arc_ids]) / counts[arc_ids]
+        angles = start_angles[arc_ids] + sweeps[arc_ids] * t
+        pts = centers[arc_ids] + radii[arc_ids, None] * np.column_stack((np.cos(angles), np.sin(angles)))
+
+        # Consecutive points of the same arc form a segment
+        same_arc = arc_ids[:-1] == arc_ids[1:]
+        return np.stack((pts[:-1][same_arc], pts[1:][same_arc]), axis=1)
+
+    def bulge_polyline_segments(self, pts, bulges, closed, chord_tol=1.0):
+        """Segments of a polyline whose vertices may carry bulge (arc) values"""
+        pts = np.asarray(pts, dtype=float).reshape(-1, 2)
+        bulges = np.asarray(bulges, dtype=float)
+        if len(pts) < 2:
+            return np.empty((0, 2, 2))
+        if closed:
+            starts, ends = pts, np.roll(pts, -1, axis=0)
+        else:
+            starts, ends, bulges = pts[:-1], pts[1:], bulges[:-1]
+
+        straight = np.abs(bulges) < 1e-12
+        segments = [np.stack((starts[straight], ends[straight]), axis=1)]
+
+        if not straight.all():
+            p0, p1, b = starts[~straight], ends[~straight], bulges[~straight]
+            chord = p1 - p0
+            c = np.linalg.norm(chord, axis=1)
+            normal = np.column_stack((-chord[:, 1], chord[:, 0])) / np.maximum(c, 1e-12)[:, None]
+            # Centre sits on the chord's perpendicular bisector, left of p0->p1 for b > 0
+            centers = (p0 + p1) / 2 + normal * (c * (1 - b ** 2) / (4 * b))[:, None]
+            radii = np.linalg.norm(p0 - centers, axis=1)
+            start_angles = np.arctan2(p0[:, 1] - centers[:, 1], p0[:, 0] - centers[:, 0])
+            segments.append(self.flatten_arcs(centers, radii, start_angles, 4 * np.arctan(b), chord_tol))
+
+        return np.concatenate(segments)
+
+    def entity_segments(self, entity, chord_tol=1.0):
+        """Line segments (N, 2, 2) of one boundary entity in its own coordinate system"""
+        dxftype = entity.dxftype()
+        if dxftype == 'LINE':
+            segments = np.array([[[entity.dxf.start.x, entity.dxf.start.y],
+                                  [entity.dxf.end.x, entity.dxf.end.y]]], dtype=float)
+        elif dxftype == 'LWPOLYLINE':
+            pts = [(pt[0], pt[1], pt[2]) for pt in entity.get_points('xyb')]
+            if not pts:
+                return np.empty((0, 2, 2))
+            pts = np.array(pts, dtype=float)
+            segments = self.bulge_polyline_segments(pts[:, :2], pts[:, 2], entity.closed, chord_tol)
+        elif dxftype == 'POLYLINE':
+            vertices = list(entity.vertices)
+            if not vertices:
+                return np.empty((0, 2, 2))
+            pts = [(v.dxf.location.x, v.dxf.location.y) for v in vertices]
+            bulges = [v.dxf.get('bulge', 0) for v in vertices]
+            # POLYLINE boundaries are always treated as closed
+            if pts[0] == pts[-1]:
+                pts, bulges = pts[:-1], bulges[:-1]
+            segments = self.bulge_polyline_segments(pts, bulges, True, chord_tol)
+        elif dxftype in ('ARC', 'CIRCLE'):
+            center = (entity.dxf.center.x, entity.dxf.center.y)
+            if dxftype == 'CIRCLE':
+                start, sweep = 0.0, 2 * math.pi
+            else:
+                start = math.radians(entity.dxf.start_angle)
+                sweep = math.radians((entity.dxf.end_angle - entity.dxf.start_angle) % 360) or 2 * math.pi
+            segments = self.flatten_arcs([center], [entity.dxf.radius], [start], [sweep], chord_tol)
+        elif dxftype in ('SPLINE', 'ELLIPSE'):
+            # Already in WCS; ezdxf flattens these to the requested chord distance
+            pts = np.array([(v.x, v.y) for v in entity.flattening(chord_tol)], dtype=float)
+            if len(pts) < 2:
+                return np.empty((0, 2, 2))
+            return np.stack((pts[:-1], pts[1:]), axis=1)
+        else:
+            return np.empty((0, 2, 2))
+
+        # OCS with a downward extrusion (mirrored entities) maps to WCS as x -> -x
+        if dxftype != 'LINE' and entity.dxf.hasattr('extrusion') and entity.dxf.extrusion.z < 0:
+            segments = segments * np.array([-1.0, 1.0])
+        return segments
+
+    def block_segments(self, block_name, layer_name, inherit_layer, chord_tol=1.0):
+        """Boundary segments of a block definition in block coordinates.
+
+        Entities on layer_name are taken; when inherit_layer is set (the INSERT
+        itself is on layer_name) entities on layer '0' are taken as well. The
+        result is cached, so repeated INSERTs of the same block reuse it and only
+        pay for their transform.
+        """
+        key = (block_name, layer_name.lower(), inherit_layer, chord_tol)
+        if key in self.block_cache:
+            return self.block_cache[key]
+
+        self.block_cache[key] = np.empty((0, 2, 2))  # Guard against self-referencing blocks
+        block = self.doc.blocks.get(block_name) if self.doc else None
+        segments = []
+        if block is not None:
+            for entity in block:
+                entity_layer = entity.dxf.layer.lower() if hasattr(entity.dxf, 'layer') else '0'
+                on_layer = entity_layer == layer_name.lower() or (inherit_layer and entity_layer == '0')
+                if entity.dxftype() == 'INSERT':
+                    segments.append(self.insert_segments(entity, layer_name, on_layer, chord_tol))
+                elif on_layer:
+                    segments.append(self.entity_segments(entity, chord_tol))
+
+        result = np.concatenate(segments) if segments else np.empty((0, 2, 2))
+        self.block_cache[key] = result
+        return result
+
+    def insert_segments(self, insert, layer_name, on_layer, chord_tol=1.0):
+        """Block segments placed by an INSERT (including MINSERT arrays) in parent coordinates"""
+        local = self.block_segments(insert.dxf.name, layer_name, on_layer, chord_tol)
+        if len(local) == 0:
+            return local
+
+        placed = []
+        inserts = insert.multi_insert() if insert.mcount > 1 else [insert]
+        for ins in inserts:
+            m = np.array(list(ins.matrix44().rows()), dtype=float)
+            placed.append(local @ m[:2, :2] + m[3, :2])
+        return np.concatenate(placed)
+
+    def collect_and_clean_linework(self, layer_name, tol=1e-2, chord_tol=1.0):
+        segments = [self.entity_segments(entity, chord_tol)
+                    for entity in self.get_layer_entities(layer_name, LINEWORK_TYPES, ignore_case=True)]
+
+        # Rooms drawn inside blocks: every INSERT, whatever its own layer
+        insert_count = 0
+        for layer, type_entities in self.layer_index.items():
+            on_layer = layer.lower() == layer_name.lower()
+            for insert in type_entities.get('INSERT', []):
+                segments.append(self.insert_segments(insert, layer_name, on_layer, chord_tol))
+                insert_count += 1
+        if insert_count:
+            print(f"🧱 Expanded {insert_count} block references ({len(self.block_cache)} block definitions flattened)")
+
+        segments = np.concatenate(segments) if segments else np.empty((0, 2, 2))
+        raw_lines = [((a[0], a[1]), (b[0], b[1])) for a, b in segments.tolist()]
         return self.clean_and_snap_lines(raw_lines, tol)
 
     def clean_and_snap_lines(self, raw_lines, tol=1e-2):
-        all_pts = list(set([pt for line in raw_lines for pt in line]))
-        snapped_pts = []
+        # Spatial hash of snapped points: cells are tol wide, so any point within
+        # tol of a query point lives in the query cell or one of its 8 neighbours
+        cell_size = tol if tol > 0 else 1.0
+        grid = defaultdict(list)
+        snapped_cache = {}
+        snapped_count = 0
 
         def find_or_add(pt):
-            for s in snapped_pts:
-                if np.linalg.norm(np.array(pt) - np.array(s)) < tol:
-                    return s
-            snapped_pts.append(pt)
+            nonlocal snapped_count
+            if pt in snapped_cache:
+                return snapped_cache[pt]
+
+            cx = math.floor(pt[0] / cell_size)
+            cy = math.floor(pt[1] / cell_size)
+
+            # Keep the original semantics: snap to the EARLIEST snapped point in range
+            best = None
+            for ix in (cx - 1, cx, cx + 1):
+                for iy in (cy - 1, cy, cy + 1):
+                    for order, s in grid.get((ix, iy), ()):
+                        if (best is None or order < best[0]) and math.hypot(pt[0] - s[0], pt[1] - s[1]) < tol:
+                            best = (order, s)
+
+            if best is not None:
+                snapped_cache[pt] = best[1]
+                return best[1]
+
+            grid[(cx, cy)].append((snapped_count, pt))
+            snapped_count += 1
+            snapped_cache[pt] = pt
             return pt
 
         clean_lines = []
@@ -98,102 +396,196 @@ class CustomDxfProcessor:
             graph[b].add(a)
         return graph
 
-    def find_closed_loops(self, graph, max_depth=100):
-        visited_edges = set()
-        loops = []
-
-        def dfs(path, start):
-            current = path[-1]
-            for neighbor in graph[current]:
-                edge = tuple(sorted((current, neighbor)))
-                if edge in visited_edges:
-                    continue
-                if neighbor == start and len(path) >= 3:
-                    loop = path + [neighbor]
-                    loops.append(loop)
-                    for i in range(len(loop) - 1):
-                        visited_edges.add(tuple(sorted((loop[i], loop[i + 1]))))
-                    return
-                elif neighbor not in path and len(path) < max_depth:
-                    dfs(path + [neighbor], start)
-
-        for pt in graph:
-            dfs([pt], pt)
-
-        return loops
-
-    def heal_graph_gaps(self, lines, snap_tol=5.0):
+    def find_closed_loops(self, graph):
+        """Return the closed vertex loop of every minimal face in the point graph"""
+        lines = [(a, b) for a, nbrs in graph.items() for b in nbrs if a < b]
+        faces = self.extract_planar_faces(lines, holes_as_rooms=True)
+        return [list(face.exterior.coords) for face in faces]
+
+    def extract_planar_faces(self, lines, holes_as_rooms=False):
+        """Extract every minimal bounded face of the linework.
+
+        The lines are noded (split at every crossing) and polygonized, which
+        traces each face once in near-linear time; the unbounded outer face is
+        never emitted. Loops nested inside a face (columns, shafts) become holes
+        of that face and, unless holes_as_rooms is set, the faces covering a
+        hole are not returned themselves.
+        """
+        if not lines:
+            return []
+
+        noded = unary_union(MultiLineString([list(line) for line in lines]))
+        faces = [face for face in polygonize(noded) if face.area > 0]
+
+        # Every interior ring of a face is filled by nested faces: one face, or
+        # several when the hole is subdivided (e.g. a shaft with a partition line)
+        hole_polygons = [Polygon(interior) for face in faces for interior in face.interiors]
+        in_hole = np.zeros(len(faces), dtype=bool)
+        if hole_polygons:
+            face_idx, _ = STRtree(hole_polygons).query(faces, predicate='covered_by')
+            in_hole[face_idx] = True
+
+        rooms = []
+        holes = int(in_hole.sum())
+        for face, nested in zip(faces, in_hole):
+            if nested and not holes_as_rooms:
+                continue
+            rooms.append(face)
+
+        print(f"🧩 Extracted {len(faces)} planar faces ({holes} nested in other faces)")
+        return rooms
+
+    def heal_graph_gaps(self, lines, snap_tol=5.0, nearest_only=False):
+        """Bridge dangling endpoints closer than snap_tol using a KD-tree.
+
+        With nearest_only=True each endpoint is connected only to its closest
+        dangling partner instead of every partner within snap_tol.
+        """
         graph = self.build_point_graph(lines)
         endpoints = [pt for pt, nbrs in graph.items() if len(nbrs) == 1]
         healed_lines = list(lines)
-        added = 0
-
-        for i in range(len(endpoints)):
-            for j in range(i + 1, len(endpoints)):
-                a = endpoints[i]
-                b = endpoints[j]
-                dist = np.linalg.norm(np.array(a) - np.array(b))
-                if dist < snap_tol:
-                    healed_lines.append((a, b))
-                    added += 1
-
-        print(f"🔗 Healed {added} gaps")
+
+        stats = {
+            'dangling_endpoints': len(endpoints),
+            'candidate_pairs': 0,
+            'gaps_healed': 0,
+            'max_gap': 0.0,
+            'mean_gap': 0.0,
+            'remaining_dangling': len(endpoints)
+        }
+
+        if len(endpoints) >= 2:
+            pts = np.array(endpoints, dtype=float)
+            tree = cKDTree(pts)
+
+            # One query for every pair within snap_tol (query_pairs is inclusive)
+            pairs = tree.query_pairs(snap_tol, output_type='ndarray')
+            if len(pairs):
+                dists = np.linalg.norm(pts[pairs[:, 0]] - pts[pairs[:, 1]], axis=1)
+                keep = dists < snap_tol
+                pairs, dists = pairs[keep], dists[keep]
+            stats['candidate_pairs'] = len(pairs)
+
+            if len(pairs) and nearest_only:
+                # Closest partner of every endpoint, keeping each pair once
+                nn_dists, nn_idx = tree.query(pts, k=2, distance_upper_bound=snap_tol)
+                chosen = {}
+                for i in range(len(pts)):
+                    j = nn_idx[i, 1]
+                    if j < len(pts) and nn_dists[i, 1] < snap_tol:
+                        chosen[(min(i, j), max(i, j))] = nn_dists[i, 1]
+                pairs = np.array(list(chosen.keys()), dtype=int).reshape(-1, 2)
+                dists = np.array(list(chosen.values()), dtype=float)
+
+            if len(pairs):
+                # Deterministic output order, same as the original pairwise scan
+                order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+                pairs, dists = pairs[order], dists[order]
+                for i, j in pairs:
+                    healed_lines.append((endpoints[i], endpoints[j]))
+
+                stats['gaps_healed'] = len(pairs)
+                stats['max_gap'] = float(dists.max())
+                stats['mean_gap'] = float(dists.mean())
+                stats['remaining_dangling'] = len(endpoints) - len(np.unique(pairs))
+
+        self.healing_stats = stats
+        print(f"🔗 Healed {stats['gaps_healed']} gaps "
+              f"({stats['dangling_endpoints']} dangling endpoints, "
+              f"{stats['remaining_dangling']} still open, max gap {stats['max_gap']:.3f})")
         return healed_lines
 
-    def extract_room_boundaries(self, layer_name="Tile Layout"):
+    def extract_room_boundaries(self, layer_name="Tile Layout", snap_tol=1e-2, heal_tol=5.0, chord_tol=1.0):
         print("Extracting room boundaries...")
-        lines = self.collect_and_clean_linework(layer_name)
+        lines = self.collect_and_clean_linework(layer_name, tol=snap_tol, chord_tol=chord_tol)
         if not lines:
             print(f"No lines found in layer '{layer_name}'")
             return []
 
-        lines = self.heal_graph_gaps(lines, snap_tol=5.0)
-        graph = self.build_point_graph(lines)
-        loops = self.find_closed_loops(graph)
+        lines = self.heal_graph_gaps(lines, snap_tol=heal_tol)
+        faces = self.extract_planar_faces(lines)
 
-        polygons = []
-        for loop in loops:
-            poly = Polygon(loop)
-            if poly.is_valid and poly.area > 0:
-                polygons.append(poly)
+        polygons = [poly for poly in faces if poly.is_valid and poly.area > 0]
 
         self.room_polygons = polygons
+        self.start_points_layer = None  # Room ids of any extracted SPs are now stale
         print(f"✅ Found {len(polygons)} room boundary polygons.")
         return polygons
 
+    def assign_points_to_rooms(self, points):
+        """Find the containing room of every point with one bulk STRtree query.
+
+        Returns (room_ids, report): room_ids holds the lowest containing room
+        index per point (-1 if none), report lists the points that fall in no
+        room and those that fall in several rooms.
+        """
+        room_ids = np.full(len(points), -1, dtype=int)
+        report = {'unassigned': [], 'ambiguous': {}}
+        if len(points) == 0:
+            return room_ids, report
+
+        if self.room_polygons:
+            rooms = np.array(self.room_polygons, dtype=object)
+            shapely.prepare(rooms)
+            tree = STRtree(rooms)
+            # Pairs (point index, room index) where the point lies within the room
+            point_idx, room_idx = tree.query(shapely.points(points), predicate='within')
+
+            matches = defaultdict(list)
+            for p_i, r_i in zip(point_idx.tolist(), room_idx.tolist()):
+                matches[p_i].append(r_i)
+            for p_i, r_list in matches.items():
+                r_list.sort()
+                room_ids[p_i] = r_list[0]
+                if len(r_list) > 1:
+                    report['ambiguous'][p_i] = r_list
+
+        report['unassigned'] = [i for i in range(len(points)) if room_ids[i] == -1]
+        return room_ids, report
+
     def extract_start_points(self, layer_name="SP"):
         print("Extracting starting points from 'SP' layer...")
+        sp_polys = []
+        for entity in self.get_layer_entities(layer_name, ('LWPOLYLINE',)):
+            if entity.closed:
+                vertices = [(pt[0], pt[1]) for pt in entity.get_points()]
+                poly = Polygon(vertices)
+                if poly.is_valid and poly.area > 0:
+                    sp_polys.append(poly)
+
+        # Find which room contains each start point
+        centroids = [(poly.centroid.x, poly.centroid.y) for poly in sp_polys]
+        room_ids, report = self.assign_points_to_rooms(centroids)
+        self.sp_assignment_report = report
+
         start_points = []
-        for entity in self.doc.modelspace():
-            if hasattr(entity.dxf, 'layer') and entity.dxf.layer == layer_name:
-                if entity.dxftype() == 'LWPOLYLINE' and entity.closed:
-                    vertices = [(pt[0], pt[1]) for pt in entity.get_points()]
-                    poly = Polygon(vertices)
-                    if poly.is_valid and poly.area > 0:
-                        centroid = poly.centroid
-                        # Find which room contains this start point
-                        room_id = -1
-                        for i, room_poly in enumerate(self.room_polygons):
-                            if room_poly.contains(Point(centroid)):
-                                room_id = i
-                                break
-                        
-                        start_points.append({
-                            'polygon': poly,
-                            'centroid': (centroid.x, centroid.y),
-                            'width': round(poly.bounds[2] - poly.bounds[0], 2),
-                            'height': round(poly.bounds[3] - poly.bounds[1], 2),
-                            'area': poly.area,
-                            'room_id': room_id
-                        })
+        for poly, centroid, room_id in zip(sp_polys, centroids, room_ids):
+            start_points.append({
+                'polygon': poly,
+                'centroid': centroid,
+                'width': round(poly.bounds[2] - poly.bounds[0], 2),
+                'height': round(poly.bounds[3] - poly.bounds[1], 2),
+                'area': poly.area,
+                'room_id': int(room_id)
+            })
+
+        if report['unassigned']:
+            print(f"⚠️ {len(report['unassigned'])} starting points are not inside any room: {report['unassigned']}")
+        for sp_idx, r_list in report['ambiguous'].items():
+            print(f"⚠️ Starting point {sp_idx} lies in {len(r_list)} rooms {r_list}, assigned to room {r_list[0]}")
 
         self.start_points = start_points
+        self.start_points_layer = layer_name
         print(f"✅ Found {len(start_points)} starting points.")
         return start_points
 
     def extract_tile_sizes_from_sp(self, layer_name="SP"):
         print("Extracting tile sizes from SP layer...")
-        self.sp_polygons = self.extract_start_points(layer_name=layer_name)
+        # Reuse the start points already extracted for this layer
+        if self.start_points_layer == layer_name:
+            self.sp_polygons = self.start_points
+        else:
+            self.sp_polygons = self.extract_start_points(layer_name=layer_name)
         tile_sizes = {(sp['width'], sp['height']) for sp in self.sp_polygons}
         print(f"✅ Extracted {len(tile_sizes)} unique tile sizes from SP layer.")
         return list(tile_sizes)
\ No newline at end of file
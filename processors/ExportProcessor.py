@@ -6,10 +6,38 @@ from datetime import datetime
 import re
 from shapely.geometry import Polygon, Point, MultiPolygon
 
+from processors.TileSet import TileSet
+
 class ExportProcessor:
     def __init__(self):
         pass
 
+    def get_apartment_levels(self, final_room_df):
+        """Map each apartment to its level (drawings without levels are all 'Level 0')"""
+        if final_room_df is None or final_room_df.empty or 'level' not in final_room_df.columns:
+            return {}
+        return final_room_df.groupby('apartment_name')['level'].first().to_dict()
+
+    def get_apartment_level_indexes(self, final_room_df):
+        """Map each apartment to its numeric level index (the order levels are listed in)"""
+        if final_room_df is None or final_room_df.empty or 'level' not in final_room_df.columns:
+            return {}
+        if 'level_index' in final_room_df.columns:
+            indexes = final_room_df['level_index']
+        else:
+            # Sessions stored before level_index existed: the number in "Level N"
+            indexes = final_room_df['level'].astype(str).str.extract(r'(\d+)\s*$')[0].astype(float)
+        return indexes.groupby(final_room_df['apartment_name']).first().to_dict()
+
+    def sort_by_level(self, df, apartment_column, level_indexes):
+        """Rows grouped by level in numeric order, then by apartment"""
+        if df.empty:
+            return df
+        order = df[apartment_column].map(level_indexes).fillna(0)
+        return (df.assign(_level_index=order)
+                .sort_values(['_level_index', apartment_column], kind='stable')
+                .drop(columns='_level_index'))
+
     def export_small_tiles_report(self, small_tiles_df, size_threshold=10, output_prefix="small_tiles"):
         """Export small tiles data to files"""
         if len(small_tiles_df) == 0:
@@ -93,6 +121,8 @@ class ExportProcessor:
         
         # Get pattern mode from the tiles classification
         has_pattern = 'cut_x' in tiles_df['classification'].unique() or 'cut_y' in tiles_df['classification'].unique()
+        apartment_levels = self.get_apartment_levels(final_room_df)
+        apartment_level_indexes = self.get_apartment_level_indexes(final_room_df)
 
         # Process full and irregular tiles
         print("\n🔄 Processing full and irregular tiles...")
@@ -109,7 +139,7 @@ class ExportProcessor:
                 apt_name = row['apartment_name']
                 has_irregular = apt_name in irregular_df['apartment_name'].values
                 full_tiles_summary.append({
-                    'LEVEL': 'Level 0',
+                    'LEVEL': apartment_levels.get(apt_name, 'Level 0'),
                     'APPATMENT NO': apt_name,
                     'TYPE': 'TL-1',
                     'COUNT': row['COUNT'],
@@ -117,7 +147,8 @@ class ExportProcessor:
                     'Remarks': "Full + irregular" if has_irregular else ""
                 })
             
-            full_tiles_export = pd.DataFrame(full_tiles_summary)
+            full_tiles_export = self.sort_by_level(pd.DataFrame(full_tiles_summary), 'APPATMENT NO',
+                                                   apartment_level_indexes)
         else:
             full_tiles_export = pd.DataFrame(columns=[
                 'LEVEL', 'APPATMENT NO', 'TYPE', 'COUNT', 'LOCATION(room name)', 'Remarks'
@@ -306,11 +337,7 @@ class ExportProcessor:
             apt_df = all_tiles_for_area[all_tiles_for_area['apartment_name'] == apt_name]
             
             # Sum up all tile areas for this apartment
-            total_area = sum(
-                tile['polygon'].area 
-                for _, tile in apt_df.iterrows() 
-                if isinstance(tile['polygon'], (Polygon, MultiPolygon))
-            )
+            total_area = TileSet.from_dataframe(apt_df).total_area()
             
             # Convert to square meters
             total_area_sqm = total_area / 1000000
@@ -319,14 +346,16 @@ class ExportProcessor:
             small_cuts_count = len(small_tiles_df[small_tiles_df['apartment_name'] == apt_name]) if not small_tiles_df.empty else 0
             
             area_by_apt.append({
+                'LEVEL': apartment_levels.get(apt_name, 'Level 0'),
                 'APPATMENT NO': apt_name,
                 'TYPE': 'TL-1',
                 'AREA (sqm)': f"{total_area_sqm:.3f}",
                 'STATUS': f"Includes {small_cuts_count} small cuts" if small_cuts_count > 0 else "No small cuts"
             })
         
-        # Create area dataframe
+        # Create area dataframe, grouped by level
         area_export = pd.DataFrame(area_by_apt)
+        area_export = self.sort_by_level(area_export, 'APPATMENT NO', apartment_level_indexes)
         
         # WASTAGE ANALYSIS
         print("\n🔄 Calculating tile wastage percentages...")
@@ -354,11 +383,7 @@ class ExportProcessor:
                 apt_df = all_tiles_for_area[all_tiles_for_area['apartment_name'] == apt_name]
                 
                 # Calculate actual apartment area
-                actual_apt_area = sum(
-                    tile['polygon'].area 
-                    for _, tile in apt_df.iterrows() 
-                    if isinstance(tile['polygon'], (Polygon, MultiPolygon))
-                ) / 1000000  # in square meters
+                actual_apt_area = TileSet.from_dataframe(apt_df).total_area() / 1000000  # in square meters
                 
                 # Count tiles by classification
                 full_count = len(apt_df[apt_df['classification'] == 'full'])
@@ -853,6 +878,8 @@ class ExportProcessor:
         
         print("\n📊 Creating Enhanced Summary Excel Export...")
         
+        apartment_levels = self.get_apartment_levels(final_room_df)
+        apartment_level_indexes = self.get_apartment_level_indexes(final_room_df)
         export_path = os.getcwd()
         summary_file_path = os.path.join(export_path, f'{output_prefix}_SUMMARY_REPORT.xlsx')
         
@@ -991,6 +1018,7 @@ class ExportProcessor:
             total_unmatched = unmatched_less_half + unmatched_more_half
             
             summary_data.append({
+                'LEVEL': apartment_levels.get(apt_name, 'Level 0'),
                 'APARTMENT NO.': apt_name,
                 'APARTMENT AREA': f"{apartment_area_m2:.1f}",
                 'FULL TILES': f"({full_tiles} + {irregular_tiles} + ({total_matched})/2 + ({unmatched_less_half})/2 + {unmatched_more_half}) = {total_full_equivalents:.1f}",
@@ -998,8 +1026,9 @@ class ExportProcessor:
                 'WASTAGE %': f"({tiling_area_m2:.3f} - {apartment_area_m2:.1f}) / {apartment_area_m2:.1f} = {wastage_percentage:.2f}%"
             })
         
-        # Convert to DataFrame
+        # Convert to DataFrame, grouped by level
         summary_df = pd.DataFrame(summary_data)
+        summary_df = self.sort_by_level(summary_df, 'APARTMENT NO.', apartment_level_indexes)
         
         # Create additional detailed breakdown table
         detailed_breakdown = []
@@ -1219,6 +1248,9 @@ class ExportProcessor:
     def create_enhanced_summary_data_for_master(self, tiles_df, small_tiles_df, final_room_df, selected_matching):
         """Create enhanced summary data specifically for master workbook integration"""
         try:
+            apartment_levels = self.get_apartment_levels(final_room_df)
+            apartment_level_indexes = self.get_apartment_level_indexes(final_room_df)
+            
             # Get tile dimensions from sample tile
             sample_tiles = [tile for _, tile in tiles_df.iterrows() 
                            if 'actual_width' in tile and tile['actual_width'] > 0 
@@ -1362,6 +1394,7 @@ class ExportProcessor:
                 total_unmatched = unmatched_less_half + unmatched_more_half
                 
                 summary_data.append({
+                    'LEVEL': apartment_levels.get(apt_name, 'Level 0'),
                     'APARTMENT NO.': apt_name,
                     'APARTMENT AREA (m²)': round(apartment_area_m2, 2),
                     'FULL TILES': full_tiles,
@@ -1377,8 +1410,9 @@ class ExportProcessor:
                     'SAVINGS %': round(wastage_savings, 2)
                 })
             
-            # Convert to DataFrame
+            # Convert to DataFrame, grouped by level
             summary_df = pd.DataFrame(summary_data)
+            summary_df = self.sort_by_level(summary_df, 'APARTMENT NO.', apartment_level_indexes)
             
             # Create additional detailed breakdown table
             detailed_breakdown = []
@@ -1530,6 +1564,21 @@ class ExportProcessor:
                 'VALUE': f"{round(overall_savings, 2)}%"
             }]
             
+            # Per-level totals for drawings with several floor plates
+            if not summary_df.empty and summary_df['LEVEL'].nunique() > 1:
+                # summary_df is already in level order
+                for level, level_df in summary_df.groupby('LEVEL', sort=False):
+                    level_area = level_df['APARTMENT AREA (m²)'].sum()
+                    level_tiling_area = level_df['OPTIMISED TILING AREA (m²)'].sum()
+                    level_wastage = ((level_tiling_area - level_area) / level_area) * 100 if level_area > 0 else 0
+                    project_summary_data.extend([{
+                        'METRIC': f'{level.upper()} APARTMENTS',
+                        'VALUE': len(level_df)
+                    }, {
+                        'METRIC': f'{level.upper()} OPTIMISED WASTAGE %',
+                        'VALUE': f"{round(level_wastage, 2)}%"
+                    }])
+            
             project_summary_df = pd.DataFrame(project_summary_data)
             
             return {
@@ -0,0 +1,202 @@
+import hashlib
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.affinity import translate
+from shapely.strtree import STRtree
+
+from processors.utility_functions import display_dataframe
+
+class RevisionProcessor:
+    """Match the rooms of a revised DXF against the rooms of the previous upload"""
+
+    def __init__(self, precision=1.0, overlap_threshold=0.8):
+        # Coordinates are rounded to this grid (mm) before hashing
+        self.precision = precision
+        # Minimum intersection-over-union for a room to count as "modified"
+        self.overlap_threshold = overlap_threshold
+
+    def geometry_hash(self, polygon):
+        """Hash of the rounded, normalized polygon (same position and shape)"""
+        geom = shapely.set_precision(polygon, self.precision).normalize()
+        return hashlib.sha1(geom.wkb).hexdigest()
+
+    def shape_hash(self, polygon):
+        """Translation-invariant hash (same shape anywhere in the drawing)"""
+        minx, miny, _, _ = polygon.bounds
+        return self.geometry_hash(translate(polygon, -minx, -miny))
+
+    def diff_rooms(self, old_polygons, new_polygons):
+        """Classify every room as unchanged, moved, modified, added or removed.
+
+        Returns a DataFrame with one row per status entry: old_room_id and
+        new_room_id (-1 where not applicable), the translation (dx, dy) for
+        moved rooms and the overlap (IoU) for modified rooms.
+        """
+        print("🔍 Comparing revised rooms with the previous upload...")
+        results = []
+        old_left = set(range(len(old_polygons)))
+        new_left = set(range(len(new_polygons)))
+
+        # 1. Unchanged: identical geometry hash
+        old_by_hash = {}
+        for i in old_left:
+            old_by_hash.setdefault(self.geometry_hash(old_polygons[i]), []).append(i)
+        for j in sorted(new_left):
+            candidates = old_by_hash.get(self.geometry_hash(new_polygons[j]))
+            if candidates:
+                i = candidates.pop(0)
+                results.append(self._row('unchanged', i, j, iou=1.0))
+                old_left.discard(i)
+                new_left.discard(j)
+
+        # Overlapping old/new pairs above the IoU threshold (used by steps 2 and 3)
+        pairs = self._overlap_pairs(old_polygons, new_polygons, old_left, new_left)
+        # Old rooms still in place with a changed outline: not candidates for other rooms' moves
+        successors = {}
+        for _, i, j in pairs:
+            successors.setdefault(i, set()).add(j)
+
+        # 2. Moved: same shape somewhere else, paired with the nearest old room
+        old_by_shape = {}
+        for i in old_left:
+            old_by_shape.setdefault(self.shape_hash(old_polygons[i]), []).append(i)
+        for j in sorted(new_left):
+            candidates = [i for i in old_by_shape.get(self.shape_hash(new_polygons[j]), [])
+                          if not successors.get(i, set()) - {j}]
+            if candidates:
+                new_c = new_polygons[j].centroid
+                i = min(candidates, key=lambda k: old_polygons[k].centroid.distance(new_c))
+                old_by_shape[self.shape_hash(new_polygons[j])].remove(i)
+                old_minx, old_miny, _, _ = old_polygons[i].bounds
+                new_minx, new_miny, _, _ = new_polygons[j].bounds
+                results.append(self._row('moved', i, j, dx=new_minx - old_minx, dy=new_miny - old_miny))
+                old_left.discard(i)
+                new_left.discard(j)
+
+        # 3. Modified: best overlapping old room above the IoU threshold
+        # Greedy one-to-one assignment, best overlaps first
+        for iou, i, j in sorted(pairs, reverse=True):
+            if i in old_left and j in new_left:
+                results.append(self._row('modified', i, j, iou=iou))
+                old_left.discard(i)
+                new_left.discard(j)
+
+        # 4. Whatever is left was added or removed
+        for j in sorted(new_left):
+            results.append(self._row('added', -1, j))
+        for i in sorted(old_left):
+            results.append(self._row('removed', i, -1))
+
+        diff_df = pd.DataFrame(results)
+        counts = diff_df['status'].value_counts().to_dict() if not diff_df.empty else {}
+        print("✅ Revision diff: " + ", ".join(f"{counts.get(s, 0)} {s}" for s in
+                                              ['unchanged', 'moved', 'modified', 'added', 'removed']))
+        return diff_df
+
+    def _overlap_pairs(self, old_polygons, new_polygons, old_left, new_left):
+        """(iou, old_room_id, new_room_id) for every pair with IoU above the threshold"""
+        if not old_left or not new_left:
+            return []
+        old_ids = sorted(old_left)
+        tree = STRtree([old_polygons[i] for i in old_ids])
+        pairs = []
+        for j in sorted(new_left):
+            for k in tree.query(new_polygons[j], predicate='intersects'):
+                old_poly = old_polygons[old_ids[k]]
+                inter = old_poly.intersection(new_polygons[j]).area
+                union = old_poly.area + new_polygons[j].area - inter
+                iou = inter / union if union > 0 else 0
+                if iou >= self.overlap_threshold:
+                    pairs.append((iou, old_ids[k], j))
+        return pairs
+
+    def _row(self, status, old_room_id, new_room_id, dx=0.0, dy=0.0, iou=np.nan):
+        return {
+            'status': status,
+            'old_room_id': old_room_id,
+            'new_room_id': new_room_id,
+            'dx': dx,
+            'dy': dy,
+            'iou': iou
+        }
+
+    def carry_forward_names(self, diff_df, old_room_df, new_room_df):
+        """Copy apartment and room names from matched old rooms onto the new room_df.
+
+        Each new apartment cluster takes the most common carried apartment name
+        of its rooms; rooms without a match get default names in that apartment.
+        """
+        new_room_df = new_room_df.copy()
+        matched = diff_df[diff_df['status'] != 'removed']
+        matched = matched[matched['old_room_id'] >= 0]
+        old_by_id = old_room_df.set_index('room_id') if not old_room_df.empty else pd.DataFrame()
+        new_to_old = dict(zip(matched['new_room_id'], matched['old_room_id']))
+
+        used_apartment_names = set()
+        for apt_id in sorted(new_room_df['apartment_cluster'].unique()):
+            mask = new_room_df['apartment_cluster'] == apt_id
+            carried = [old_by_id.loc[new_to_old[r], 'apartment_name']
+                       for r in new_room_df.loc[mask, 'room_id']
+                       if r in new_to_old and new_to_old[r] in old_by_id.index]
+            carried = [name for name in carried if name not in used_apartment_names]
+            if carried:
+                apt_name = max(set(carried), key=carried.count)
+            else:
+                # Default name, skipping names already carried by other apartments
+                n = apt_id + 1
+                while f"A{n}" in used_apartment_names:
+                    n += 1
+                apt_name = f"A{n}"
+            used_apartment_names.add(apt_name)
+            new_room_df.loc[mask, 'apartment_name'] = apt_name
+
+            for n, idx in enumerate(new_room_df.index[mask]):
+                room_id = new_room_df.at[idx, 'room_id']
+                old_id = new_to_old.get(room_id)
+                if old_id is not None and old_id in old_by_id.index and 'room_name' in old_by_id.columns:
+                    new_room_df.at[idx, 'room_name'] = old_by_id.loc[old_id, 'room_name']
+                else:
+                    new_room_df.at[idx, 'room_name'] = f"{apt_name}-R{n+1}"
+
+        return new_room_df
+
+    def reusable_tiles(self, diff_df, old_apartments_data, old_start_points, new_start_points):
+        """Tiles of unchanged rooms whose start point is also unchanged, keyed by NEW room id.
+
+        Each entry holds the orientation the tiles were laid with and the tiles
+        themselves, relabelled with the new room_id; every other room must be re-tiled.
+        """
+        def sp_by_room(start_points):
+            return {sp.get('room_id', -1): (tuple(np.round(sp['centroid'], 3)), sp['width'], sp['height'])
+                    for sp in start_points}
+
+        old_sps = sp_by_room(old_start_points)
+        new_sps = sp_by_room(new_start_points)
+
+        tiles_by_old_room = {}
+        orientation_by_old_room = {}
+        for apt_data in old_apartments_data.values():
+            for tile in apt_data['tiles']:
+                tiles_by_old_room.setdefault(tile['room_id'], []).append(tile)
+                orientation_by_old_room[tile['room_id']] = apt_data['orientation']
+
+        reuse = {}
+        unchanged = diff_df[diff_df['status'] == 'unchanged']
+        for old_id, new_id in zip(unchanged['old_room_id'], unchanged['new_room_id']):
+            if old_sps.get(old_id) != new_sps.get(new_id):
+                continue
+            if old_id in tiles_by_old_room:
+                reuse[int(new_id)] = {
+                    'orientation': orientation_by_old_room[old_id],
+                    'tiles': [dict(tile, room_id=int(new_id)) for tile in tiles_by_old_room[old_id]]
+                }
+
+        print(f"♻️ Tiles reusable for {len(reuse)} unchanged rooms")
+        return reuse
+
+    def summarize(self, diff_df):
+        """Counts per status plus a printable table"""
+        display_dataframe(diff_df, "Revision Diff")
+        return {status: int((diff_df['status'] == status).sum())
+                for status in ['unchanged', 'moved', 'modified', 'added', 'removed']}
@@ -1,13 +1,31 @@
 import pandas as pd
 import numpy as np
+import shapely
 from sklearn.cluster import DBSCAN
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components, minimum_spanning_tree
+from scipy.spatial import cKDTree, Delaunay, QhullError
+from scipy.spatial.distance import pdist, squareform
 from shapely.geometry import Polygon
+from shapely.strtree import STRtree
 
 class RoomClusterProcessor:
-    def __init__(self, eps=5000, min_samples=1):
+    # eps used when 'auto' cannot find a knee (fewer than three rooms)
+    DEFAULT_EPS = 5000
+
+    def __init__(self, eps=5000, min_samples=1, method='dbscan', max_gap=150, min_contact=300):
+        # DBSCAN neighbourhood radius (mm), or 'auto' to pick it at the k-distance knee
         self.eps = eps
         self.min_samples = min_samples
+        # 'dbscan' groups room centroids; 'adjacency' groups rooms that share a wall
+        self.method = method
+        # Adjacency mode: widest wall (mm) between two rooms of the same apartment
+        self.max_gap = max_gap
+        # Adjacency mode: shortest shared wall (mm) that links two rooms (ignores corner touches)
+        self.min_contact = min_contact
         self.room_df = None
+        self.adjacency_df = None
+        self.distance_analysis = None
         self.apartment_names = {}
 
     def cluster_rooms(self, rooms):
@@ -19,10 +37,177 @@ class RoomClusterProcessor:
             'centroid_y': room_centroids[:, 1],
             'polygon': rooms
         })
-        self.room_df['apartment_cluster'] = DBSCAN(eps=self.eps, min_samples=self.min_samples).fit_predict(room_centroids)
+        if self.method == 'adjacency':
+            self.room_df['apartment_cluster'] = self.cluster_by_adjacency(rooms)
+        else:
+            analysis = self.analyze_distances(room_centroids)
+            if self.eps == 'auto':
+                self.eps = analysis['knee_eps'] or self.DEFAULT_EPS
+                print(f"📐 Auto eps: {self.eps:.0f}mm")
+            self.room_df['apartment_cluster'] = self.recluster(self.eps, analysis)
         print(f"✅ Clustered into {self.room_df['apartment_cluster'].nunique()} apartments.")
         return self.room_df
 
+    def analyze_distances(self, centroids):
+        """Distance curve used to pick eps, computed once per upload and cacheable.
+
+        With min_samples > 1 this is the sorted k-distance curve (distance to the
+        min_samples-th neighbour, counting the room itself, as DBSCAN does). With
+        min_samples == 1 that distance is always zero, and DBSCAN reduces to single
+        linkage, so the curve is the sorted edge lengths of the centroid minimum
+        spanning tree instead; the MST edges are kept so any eps can be applied
+        without recomputing distances.
+        """
+        centroids = np.asarray(centroids, dtype=float).reshape(-1, 2)
+        mst_edges = self.centroid_mst(centroids)
+
+        if self.min_samples > 1 and len(centroids) >= self.min_samples:
+            distances, _ = cKDTree(centroids).query(centroids, k=self.min_samples)
+            curve = np.sort(distances[:, -1])
+        else:
+            curve = np.sort(mst_edges[:, 2]) if len(mst_edges) else np.array([])
+
+        self.distance_analysis = {
+            'min_samples': self.min_samples,
+            'centroids': centroids.tolist(),
+            'mst_edges': mst_edges.tolist(),
+            'k_distances': curve.tolist(),
+            'knee_eps': self.find_knee(curve)
+        }
+        return self.distance_analysis
+
+    def centroid_mst(self, centroids):
+        """Euclidean minimum spanning tree of the centroids as (i, j, length) rows"""
+        n = len(centroids)
+        if n < 2:
+            return np.empty((0, 3))
+
+        # The Euclidean MST is a subgraph of the Delaunay triangulation
+        try:
+            simplices = Delaunay(centroids).simplices
+            pairs = np.vstack([simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [0, 2]]])
+            pairs = np.unique(np.sort(pairs, axis=1), axis=0)
+            lengths = np.linalg.norm(centroids[pairs[:, 0]] - centroids[pairs[:, 1]], axis=1)
+            graph = coo_matrix((lengths, (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+        except (QhullError, ValueError):
+            # Too few or collinear centroids: fall back to the complete graph
+            graph = squareform(pdist(centroids))
+
+        mst = minimum_spanning_tree(graph).tocoo()
+        return np.column_stack([mst.row, mst.col, mst.data])
+
+    def find_knee(self, curve):
+        """eps just past the knee of an ascending distance curve (Kneedle), or None"""
+        curve = np.asarray(curve, dtype=float)
+        if len(curve) < 3:
+            return None
+        spread = curve[-1] - curve[0]
+        if spread <= 0:
+            # All distances equal: nothing separates the rooms
+            return float(curve[-1])
+
+        # Point furthest below the chord of the normalised curve
+        x = np.linspace(0, 1, len(curve))
+        y = (curve - curve[0]) / spread
+        knee = int(np.argmax(x - y))
+        # Slowly rising curves put the knee early; move it to the largest step past it
+        knee += int(np.argmax(np.diff(curve[knee:]))) if knee < len(curve) - 1 else 0
+        # Halfway to the next distance, so rounding never flips an edge
+        return float((curve[knee] + curve[min(knee + 1, len(curve) - 1)]) / 2)
+
+    def recluster(self, eps, analysis=None):
+        """Apartment labels for a given eps from cached distances (no geometry needed)"""
+        analysis = analysis or self.distance_analysis
+        centroids = np.asarray(analysis['centroids'], dtype=float).reshape(-1, 2)
+        n = len(centroids)
+
+        if analysis['min_samples'] <= 1:
+            # Single linkage: cut MST edges longer than eps (same labels as DBSCAN)
+            edges = np.asarray(analysis['mst_edges'], dtype=float).reshape(-1, 3)
+            edges = edges[edges[:, 2] <= eps]
+            graph = coo_matrix(
+                (np.ones(len(edges)), (edges[:, 0].astype(int), edges[:, 1].astype(int))),
+                shape=(n, n)
+            )
+            _, labels = connected_components(graph, directed=False)
+            return labels
+
+        return DBSCAN(eps=eps, min_samples=analysis['min_samples']).fit_predict(centroids)
+
+    def assign_levels(self, level_gap=10000):
+        """Tag every room with the floor plate (level) it belongs to.
+
+        Floor plates drawn side by side in one modelspace are separated by empty
+        space: rooms closer than level_gap (mm) are linked, and each connected
+        group is a level. Levels are numbered left to right, then bottom to top.
+        """
+        rooms = self.room_df['polygon'].tolist()
+        geoms = np.asarray(rooms, dtype=object)
+        left, right = STRtree(geoms).query(geoms, predicate='dwithin', distance=level_gap)
+        n = len(rooms)
+        graph = coo_matrix((np.ones(len(left)), (left, right)), shape=(n, n))
+        n_plates, plates = connected_components(graph, directed=False)
+
+        # Order plates by their lower-left corner so level numbers follow the drawing
+        bounds = shapely.bounds(geoms)
+        plate_corners = [(bounds[plates == k, 0].min(), bounds[plates == k, 1].min(), k)
+                         for k in range(n_plates)]
+        level_of_plate = {k: level for level, (_, _, k) in enumerate(sorted(plate_corners))}
+
+        # 'level' is the display label; sort on the numeric 'level_index' ("Level 10" sorts before "Level 2" as text)
+        self.room_df['level_index'] = [level_of_plate[k] for k in plates]
+        self.room_df['level'] = [f"Level {level_of_plate[k]}" for k in plates]
+        print(f"🏗️ Found {n_plates} floor plate(s) separated by ≥ {level_gap}mm")
+        return self.room_df
+
+    def build_adjacency(self, rooms):
+        """Pairs of rooms separated by at most max_gap along at least min_contact of wall.
+
+        The contact length is the part of one room's boundary lying within max_gap
+        of the other room (the longer of both directions).
+        """
+        geoms = np.asarray(rooms, dtype=object)
+        tree = STRtree(geoms)
+        # Candidate pairs: rooms whose gap is at most max_gap
+        left, right = tree.query(geoms, predicate='dwithin', distance=self.max_gap)
+        keep = left < right
+        left, right = left[keep], right[keep]
+
+        if len(left) == 0:
+            self.adjacency_df = pd.DataFrame(columns=['room_a', 'room_b', 'contact_length'])
+            return self.adjacency_df
+
+        # Shared wall length, computed for all candidate pairs at once
+        buffered = shapely.buffer(geoms, self.max_gap, join_style='mitre')
+        boundaries = shapely.boundary(geoms)
+        contact = np.maximum(
+            shapely.length(shapely.intersection(boundaries[left], buffered[right])),
+            shapely.length(shapely.intersection(boundaries[right], buffered[left]))
+        )
+
+        self.adjacency_df = pd.DataFrame({
+            'room_a': left,
+            'room_b': right,
+            'contact_length': contact
+        })
+        return self.adjacency_df
+
+    def cluster_by_adjacency(self, rooms):
+        """Apartment labels as connected components of the room adjacency graph"""
+        adjacency_df = self.build_adjacency(rooms)
+        linked = adjacency_df[adjacency_df['contact_length'] >= self.min_contact]
+        print(f"🔗 {len(linked)} shared walls (gap ≤ {self.max_gap}mm, contact ≥ {self.min_contact}mm) "
+              f"between {len(rooms)} rooms")
+
+        n = len(rooms)
+        graph = coo_matrix(
+            (np.ones(len(linked)), (linked['room_a'].astype(int), linked['room_b'].astype(int))),
+            shape=(n, n)
+        )
+        # Components are numbered in order of their lowest room_id, so labels are reproducible
+        _, labels = connected_components(graph, directed=False)
+        return labels
+
     def assign_default_names(self):
         print("🔤 Assigning default apartment and room names...")
         self.apartment_names = {}
@@ -1,32 +1,67 @@
 import numpy as np
 import pandas as pd
+import shapely
 from shapely.geometry import Polygon, Point, MultiPolygon
 from shapely.affinity import rotate, translate
 from shapely.ops import unary_union
 import math
+import json
+import hashlib
+import pickle
 import traceback
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from processors.utility_functions import display_dataframe
+from processors.TileSet import TileSet
+from processors.geometry_utils import is_axis_aligned, normalize_orientation, int_if_whole, rotate_geometries, mirror_translate_geometries
+
+def tile_room_job(job):
+    """Tile one room from picklable inputs (runs in a worker process)"""
+    (room_id, room_wkb, orientation, start_point, tile_size,
+     stagger_percent, stagger_direction, grout_thickness, sp_includes_grout, engine) = job
+    return TileProcessor(engine=engine).generate_tile_grid(
+        shapely.from_wkb(room_wkb), orientation, start_point, tile_size,
+        stagger_percent, stagger_direction, room_id, grout_thickness, sp_includes_grout
+    )
 
 class TileProcessor:
-    def __init__(self):
-        pass
+    def __init__(self, engine='vectorized', workers=1, dedup='translate'):
+        # 'vectorized' clips all grid cells with Shapely array operations; 'loop' clips one cell at a time;
+        # 'analytic' uses interval arithmetic for rectilinear rooms (and 'vectorized' for any other room)
+        self.engine = engine
+        # Worker processes for tiling rooms in parallel (1 = serial)
+        self.workers = workers
+        # Rooms repeated in the plan are tiled once: 'translate' (copies), 'mirror' (also mirrored
+        # copies, without stagger) or 'off'
+        self.dedup = dedup
+        # Long-lived process pool shared by all requests (created on first use)
+        self._pool = None
+        self._pool_workers = 0
+        self._pool_lock = threading.Lock()
 
     def generate_tile_grid(self, room_poly, orientation=0, start_point=None, tile_size=(600, 600),
                       stagger_percent=0, stagger_direction='x', room_id=-1,
                       grout_thickness=3, sp_includes_grout=True):
         """Generate grid-aligned tiles with FIXED start point positioning"""
+        orientation = normalize_orientation(orientation)
+        
+        # Off-axis orientations are tiled in the tile frame and rotated back
+        if not is_axis_aligned(orientation):
+            return self.generate_rotated_tile_grid(
+                room_poly, orientation, start_point, tile_size, stagger_percent, stagger_direction,
+                room_id, grout_thickness, sp_includes_grout
+            )
         
         # Process tile dimensions based on whether SP includes grout
         # All calculations in MILLIMETERS (keeping your existing units)
-        if sp_includes_grout:
-            layout_tw, layout_th = tile_size  # Layout size (with grout) in mm
-            actual_tile_width = tile_size[0] - grout_thickness  # Factory size in mm
-            actual_tile_height = tile_size[1] - grout_thickness  # Factory size in mm
-        else:
-            actual_tile_width, actual_tile_height = tile_size  # Factory size in mm
-            layout_tw = tile_size[0] + grout_thickness  # Layout size (with grout) in mm
-            layout_th = tile_size[1] + grout_thickness  # Layout size (with grout) in mm
+        # Whole sizes are stored as ints, matching what TileSet.to_tiles gives back for cached tiles
+        grout_thickness = int_if_whole(grout_thickness)
+        layout_tw, layout_th, actual_tile_width, actual_tile_height = (
+            int_if_whole(size) for size in self.layout_tile_sizes(tile_size, grout_thickness, sp_includes_grout)
+        )
 
         # Process start_point - KEEP EXACT COORDINATES
         if start_point is None:
@@ -69,143 +104,71 @@ class TileProcessor:
 
         print(f"  Grid extent: {tiles_left} left, {tiles_right} right, {tiles_down} down, {tiles_up} up from start point")
 
-        # Generate tiles with stagger logic
-        if stagger_direction == 'x':
-            # Horizontal staggering
-            for row in range(-tiles_down, tiles_up + 1):
-                y = sy + (row * layout_th)
-                
-                # Calculate stagger offset for this row
-                x_offset = stagger_size if (row % 2 == 1 and stagger_percent > 0) else 0
-                
-                for col in range(-tiles_left, tiles_right + 1):
-                    x = sx + (col * layout_tw) + x_offset
-                    
-                    # Center of this tile
-                    cx, cy = x, y
-
-                    # Create the layout tile polygon (with grout) for coverage calculations
-                    layout_tile = Polygon([
-                        (cx - layout_tw / 2, cy - layout_th / 2),
-                        (cx + layout_tw / 2, cy - layout_th / 2),
-                        (cx + layout_tw / 2, cy + layout_th / 2),
-                        (cx - layout_tw / 2, cy + layout_th / 2)
-                    ])
-
-                    # Create the actual tile polygon (factory size without grout)
-                    actual_tile = Polygon([
-                        (cx - actual_tile_width / 2, cy - actual_tile_height / 2),
-                        (cx + actual_tile_width / 2, cy - actual_tile_height / 2),
-                        (cx + actual_tile_width / 2, cy + actual_tile_height / 2),
-                        (cx - actual_tile_width / 2, cy + actual_tile_height / 2)
-                    ])
-
-                    # Process the tile if it intersects with the room
-                    if layout_tile.is_valid and layout_tile.intersects(room_poly):
-                        layout_intersection = layout_tile.intersection(room_poly)
-                        if not layout_intersection.is_empty and layout_intersection.area > 0:
-                            if actual_tile.intersects(room_poly):
-                                actual_intersection = actual_tile.intersection(room_poly)
-                                is_full = actual_intersection.equals(actual_tile)
-
-                                # Special marking for the start point tile
-                                is_start_tile = (col == 0 and row == 0)
-                                
-                                room_tiles.append({
-                                    'polygon': actual_intersection,
-                                    'layout_polygon': layout_intersection,
-                                    'room_id': room_id,
-                                    'width': layout_tw,
-                                    'height': layout_th,
-                                    'actual_tile_width': actual_tile_width,
-                                    'actual_tile_height': actual_tile_height,
-                                    'centroid': (cx, cy),
-                                    'area': actual_intersection.area,
-                                    'type': 'full' if is_full else 'cut',
-                                    'orientation': orientation,
-                                    'grout_thickness': grout_thickness,
-                                    'is_start_tile': is_start_tile,
-                                    'grid_position': (col, row)
-                                })
-                                
-                                if is_start_tile:
-                                    print(f"  ✓ Start point tile placed at EXACT position: ({cx:.3f}, {cy:.3f})")
-
-        else:  # stagger_direction == 'y'
-            # Vertical staggering
-            for col in range(-tiles_left, tiles_right + 1):
-                x = sx + (col * layout_tw)
-                
-                # Calculate stagger offset for this column
-                y_offset = stagger_size if (col % 2 == 1 and stagger_percent > 0) else 0
-                
-                for row in range(-tiles_down, tiles_up + 1):
-                    y = sy + (row * layout_th) + y_offset
-                    
-                    # Center of this tile
-                    cx, cy = x, y
-
-                    layout_tile = Polygon([
-                        (cx - layout_tw / 2, cy - layout_th / 2),
-                        (cx + layout_tw / 2, cy - layout_th / 2),
-                        (cx + layout_tw / 2, cy + layout_th / 2),
-                        (cx - layout_tw / 2, cy + layout_th / 2)
-                    ])
-
-                    actual_tile = Polygon([
-                        (cx - actual_tile_width / 2, cy - actual_tile_height / 2),
-                        (cx + actual_tile_width / 2, cy - actual_tile_height / 2),
-                        (cx + actual_tile_width / 2, cy + actual_tile_height / 2),
-                        (cx - actual_tile_width / 2, cy + actual_tile_height / 2)
-                    ])
-
-                    if layout_tile.is_valid and layout_tile.intersects(room_poly):
-                        layout_intersection = layout_tile.intersection(room_poly)
-                        if not layout_intersection.is_empty and layout_intersection.area > 0:
-                            if actual_tile.intersects(room_poly):
-                                actual_intersection = actual_tile.intersection(room_poly)
-                                is_full = actual_intersection.equals(actual_tile)
-
-                                is_start_tile = (col == 0 and row == 0)
-
-                                room_tiles.append({
-                                    'polygon': actual_intersection,
-                                    'layout_polygon': layout_intersection,
-                                    'room_id': room_id,
-                                    'width': layout_tw,
-                                    'height': layout_th,
-                                    'actual_tile_width': actual_tile_width,
-                                    'actual_tile_height': actual_tile_height,
-                                    'centroid': (cx, cy),
-                                    'area': actual_intersection.area,
-                                    'type': 'full' if is_full else 'cut',
-                                    'orientation': orientation,
-                                    'grout_thickness': grout_thickness,
-                                    'is_start_tile': is_start_tile,
-                                    'grid_position': (col, row)
-                                })
-                                
-                                if is_start_tile:
-                                    print(f"  ✓ Start point tile placed at EXACT position: ({cx:.3f}, {cy:.3f})")
-
-        # Verify coverage
-        room_area = room_poly.area
-        combined_tiles = None
-        for tile in room_tiles:
-            poly = tile['layout_polygon']
-            if combined_tiles is None:
-                combined_tiles = poly
-            else:
-                try:
-                    combined_tiles = combined_tiles.union(poly)
-                except:
-                    try:
-                        combined_tiles = combined_tiles.buffer(0).union(poly.buffer(0))
-                    except:
-                        continue
-
-        if combined_tiles:
-            coverage_pct = (combined_tiles.area / room_area) * 100
+        # Candidate cells in the same order the original nested loops visited them
+        cell_x, cell_y, cell_col, cell_row = self.grid_cell_centers(
+            sx, sy, layout_tw, layout_th, tiles_left, tiles_right, tiles_down, tiles_up,
+            stagger_size, stagger_percent, stagger_direction
+        )
+
+        # Drop cells whose row (or column) band doesn't reach the room
+        candidates = self.scanline_candidates(
+            room_poly, cell_x, cell_y,
+            max(layout_tw, actual_tile_width) / 2, max(layout_th, actual_tile_height) / 2,
+            by_rows=(stagger_direction == 'x')
+        )
+        print(f"  Scanline pruning: {len(candidates)} of {len(cell_x)} grid cells are candidates")
+        cell_x = [cell_x[i] for i in candidates]
+        cell_y = [cell_y[i] for i in candidates]
+        cell_col = [cell_col[i] for i in candidates]
+        cell_row = [cell_row[i] for i in candidates]
+
+        # The analytic engine handles rooms whose walls all run along the grid axes
+        slabs = self.rectilinear_slabs(room_poly) if self.engine == 'analytic' else None
+
+        if self.engine == 'loop':
+            tile_geoms = self.clip_cells_loop(
+                room_poly, cell_x, cell_y, layout_tw, layout_th, actual_tile_width, actual_tile_height
+            )
+        elif slabs is not None:
+            tile_geoms = self.clip_cells_analytic(
+                room_poly, slabs, cell_x, cell_y, layout_tw, layout_th, actual_tile_width, actual_tile_height
+            )
+        else:
+            tile_geoms = self.clip_cells_vectorized(
+                room_poly, cell_x, cell_y, layout_tw, layout_th, actual_tile_width, actual_tile_height
+            )
+
+        for i, actual_intersection, layout_intersection, is_full in tile_geoms:
+            cx, cy = cell_x[i], cell_y[i]
+            col, row = cell_col[i], cell_row[i]
+
+            # Special marking for the start point tile
+            is_start_tile = (col == 0 and row == 0)
+
+            room_tiles.append({
+                'polygon': actual_intersection,
+                'layout_polygon': layout_intersection,
+                'room_id': room_id,
+                'width': layout_tw,
+                'height': layout_th,
+                'actual_tile_width': actual_tile_width,
+                'actual_tile_height': actual_tile_height,
+                'centroid': (cx, cy),
+                'area': actual_intersection.area,
+                'type': 'full' if is_full else 'cut',
+                'orientation': orientation,
+                'grout_thickness': grout_thickness,
+                'is_start_tile': is_start_tile,
+                'grid_position': (col, row)
+            })
+
+            if is_start_tile:
+                print(f"  ✓ Start point tile placed at EXACT position: ({cx:.3f}, {cy:.3f})")
+
+        # Verify coverage (layout cells are disjoint, so their areas simply add up)
+        if room_tiles:
+            coverage_pct, _ = self.measure_coverage(room_poly, [tile['layout_polygon'] for tile in room_tiles],
+                                                    find_gaps=False)
             print(f"  Room coverage: {coverage_pct:.2f}%")
             if coverage_pct < 99.5:
                 print(f"⚠️ Warning: Tiles cover only {coverage_pct:.2f}% of the room area")
@@ -221,109 +184,1019 @@ class TileProcessor:
         
         return room_tiles
 
+    def layout_tile_sizes(self, tile_size, grout_thickness=3, sp_includes_grout=True):
+        """Layout (with grout) and actual (factory) tile sizes in mm: (layout_tw, layout_th, actual_w, actual_h)"""
+        if sp_includes_grout:
+            # SP size is the layout size; the factory tile is smaller by the grout
+            return tile_size[0], tile_size[1], tile_size[0] - grout_thickness, tile_size[1] - grout_thickness
+        # SP size is the factory size; the layout cell adds the grout
+        return tile_size[0] + grout_thickness, tile_size[1] + grout_thickness, tile_size[0], tile_size[1]
+
+    def generate_rotated_tile_grid(self, room_poly, orientation, start_point=None, tile_size=(600, 600),
+                                   stagger_percent=0, stagger_direction='x', room_id=-1,
+                                   grout_thickness=3, sp_includes_grout=True):
+        """Tile a room at an arbitrary orientation angle (degrees, counter-clockwise).
+
+        The room is rotated by -orientation about the start point into the tile
+        frame, where the grid is axis-aligned, tiled and typed there, and all tile
+        geometries are rotated back with one affine transform. 'width' and
+        'height' stay in the tile frame (the tile's own axes).
+        """
+        if start_point is None:
+            centroid = room_poly.centroid
+            pivot = (centroid.x, centroid.y)
+        elif isinstance(start_point, Point):
+            pivot = (start_point.x, start_point.y)
+        else:
+            pivot = (start_point[0], start_point[1])
+        print(f"  Rotating room {room_id} into the {orientation}° tile frame about ({pivot[0]:.3f}, {pivot[1]:.3f})")
+
+        frame_room = rotate_geometries(room_poly, -orientation, pivot)
+        room_tiles = self.generate_tile_grid(
+            frame_room, 0, pivot, tile_size, stagger_percent, stagger_direction,
+            room_id, grout_thickness, sp_includes_grout
+        )
+        if not room_tiles:
+            return room_tiles
+
+        # Rotate tile and layout polygons and tile centers back in one pass each
+        n = len(room_tiles)
+        geoms = np.empty(2 * n, dtype=object)
+        geoms[:n] = [tile['polygon'] for tile in room_tiles]
+        geoms[n:] = [tile['layout_polygon'] for tile in room_tiles]
+        geoms = rotate_geometries(geoms, orientation, pivot)
+        centers = shapely.get_coordinates(rotate_geometries(
+            shapely.points([tile['centroid'] for tile in room_tiles]), orientation, pivot
+        )).tolist()
+
+        for i, tile in enumerate(room_tiles):
+            tile['polygon'] = geoms[i]
+            tile['layout_polygon'] = geoms[n + i]
+            tile['centroid'] = tuple(centers[i])
+            tile['orientation'] = orientation
+
+        return room_tiles
+
+    def grid_cell_centers(self, sx, sy, layout_tw, layout_th, tiles_left, tiles_right, tiles_down, tiles_up,
+                          stagger_size, stagger_percent, stagger_direction):
+        """Centers and grid positions of all candidate cells, as Python lists.
+
+        Cells are ordered row by row for horizontal stagger and column by column
+        for vertical stagger, so tiles come out in the same order as before.
+        """
+        cols = np.arange(-tiles_left, tiles_right + 1)
+        rows = np.arange(-tiles_down, tiles_up + 1)
+
+        if stagger_direction == 'x':
+            # Horizontal staggering: odd rows shift along x
+            row_grid, col_grid = np.meshgrid(rows, cols, indexing='ij')
+            offset = np.where((row_grid % 2 == 1) & (stagger_percent > 0), stagger_size, 0)
+            x = sx + (col_grid * layout_tw) + offset
+            y = sy + (row_grid * layout_th)
+        else:
+            # Vertical staggering: odd columns shift along y
+            col_grid, row_grid = np.meshgrid(cols, rows, indexing='ij')
+            offset = np.where((col_grid % 2 == 1) & (stagger_percent > 0), stagger_size, 0)
+            x = sx + (col_grid * layout_tw)
+            y = sy + (row_grid * layout_th) + offset
+
+        return x.ravel().tolist(), y.ravel().tolist(), col_grid.ravel().tolist(), row_grid.ravel().tolist()
+
+    def scanline_candidates(self, room_poly, cell_x, cell_y, half_w, half_h, by_rows=True):
+        """Indices (in grid order) of cells that can touch the room.
+
+        Each grid row (or column, for vertical stagger) is a band across the
+        room; intersecting the bands with the room gives the covered intervals
+        of every row, and only cells overlapping one of those intervals are kept.
+        """
+        x = np.asarray(cell_x, dtype=float)
+        y = np.asarray(cell_y, dtype=float)
+        if len(x) == 0:
+            return np.array([], dtype=int)
+
+        # Coordinate along the band and across it (row bands run along x)
+        along, across = (x, y) if by_rows else (y, x)
+        half_along, half_across = (half_w, half_h) if by_rows else (half_h, half_w)
+        lo_axis, hi_axis = (0, 2) if by_rows else (1, 3)
+
+        lines, line_of_cell = np.unique(across, return_inverse=True)
+        minx, miny, maxx, maxy = room_poly.bounds
+        if by_rows:
+            bands = shapely.box(minx, lines - half_across, maxx, lines + half_across)
+        else:
+            bands = shapely.box(lines - half_across, miny, lines + half_across, maxy)
+
+        # Covered intervals per band: bounds of each piece of band ∩ room
+        parts, line_of_part = shapely.get_parts(shapely.intersection(bands, room_poly), return_index=True)
+        part_bounds = shapely.bounds(parts)
+
+        keep = np.zeros(len(along), dtype=bool)
+        cells_by_line = np.split(np.argsort(line_of_cell, kind='stable'),
+                                 np.cumsum(np.bincount(line_of_cell, minlength=len(lines)))[:-1])
+        for line in np.unique(line_of_part):
+            cells = cells_by_line[line]
+            pieces = part_bounds[line_of_part == line]
+            cell_lo = along[cells, None] - half_along
+            cell_hi = along[cells, None] + half_along
+            overlaps = (cell_lo <= pieces[None, :, hi_axis]) & (cell_hi >= pieces[None, :, lo_axis])
+            keep[cells] = overlaps.any(axis=1)
+
+        return np.flatnonzero(keep)
+
+    def clip_cells_loop(self, room_poly, cell_x, cell_y, layout_tw, layout_th,
+                        actual_tile_width, actual_tile_height):
+        """Clip cells against the room one at a time (reference implementation).
+
+        Yields (cell index, actual intersection, layout intersection, is_full).
+        """
+        for i, (cx, cy) in enumerate(zip(cell_x, cell_y)):
+            # Create the layout tile polygon (with grout) for coverage calculations
+            layout_tile = Polygon([
+                (cx - layout_tw / 2, cy - layout_th / 2),
+                (cx + layout_tw / 2, cy - layout_th / 2),
+                (cx + layout_tw / 2, cy + layout_th / 2),
+                (cx - layout_tw / 2, cy + layout_th / 2)
+            ])
+
+            # Create the actual tile polygon (factory size without grout)
+            actual_tile = Polygon([
+                (cx - actual_tile_width / 2, cy - actual_tile_height / 2),
+                (cx + actual_tile_width / 2, cy - actual_tile_height / 2),
+                (cx + actual_tile_width / 2, cy + actual_tile_height / 2),
+                (cx - actual_tile_width / 2, cy + actual_tile_height / 2)
+            ])
+
+            # Process the tile if it intersects with the room
+            if layout_tile.is_valid and layout_tile.intersects(room_poly):
+                layout_intersection = layout_tile.intersection(room_poly)
+                if not layout_intersection.is_empty and layout_intersection.area > 0:
+                    if actual_tile.intersects(room_poly):
+                        actual_intersection = actual_tile.intersection(room_poly)
+                        yield i, actual_intersection, layout_intersection, actual_intersection.equals(actual_tile)
+
+    def clip_cells_vectorized(self, room_poly, cell_x, cell_y, layout_tw, layout_th,
+                              actual_tile_width, actual_tile_height):
+        """Clip all cells against the room with Shapely array operations.
+
+        Same filters and results as clip_cells_loop, in the same order. Cells
+        lying entirely inside the room are classified by one prepared covers()
+        test and keep their own boxes; only cells crossing the room boundary
+        are intersected.
+        """
+        cx = np.asarray(cell_x)
+        cy = np.asarray(cell_y)
+        if len(cx) == 0 or layout_tw <= 0 or layout_th <= 0:
+            return []
+        shapely.prepare(room_poly)
+
+        # Interior fast path: a covered layout cell is its own intersection, and so
+        # is its actual tile when the tile fits inside the cell (grout >= 0)
+        layout_cells = self.cell_boxes(cx, cy, layout_tw, layout_th)
+        inside = shapely.covers(room_poly, layout_cells)
+        if actual_tile_width > layout_tw or actual_tile_height > layout_th:
+            inside &= shapely.covers(room_poly, self.cell_boxes(cx, cy, actual_tile_width, actual_tile_height))
+
+        # Boundary cells: layout cells (with grout) touching the room
+        edge = np.flatnonzero(~inside)
+        edge = edge[shapely.intersects(layout_cells[edge], room_poly)]
+        edge_layout = shapely.intersection(layout_cells[edge], room_poly)
+        keep = ~shapely.is_empty(edge_layout) & (shapely.area(edge_layout) > 0)
+        edge, edge_layout = edge[keep], edge_layout[keep]
+
+        # Actual tiles (factory size) of those cells that still touch the room
+        edge_actual_cells = self.cell_boxes(cx[edge], cy[edge], actual_tile_width, actual_tile_height)
+        keep = shapely.intersects(edge_actual_cells, room_poly)
+        edge, edge_layout, edge_actual_cells = edge[keep], edge_layout[keep], edge_actual_cells[keep]
+        edge_actual = shapely.intersection(edge_actual_cells, room_poly)
+        edge_full = shapely.equals(edge_actual, edge_actual_cells)
+
+        # Merge both groups back into grid order
+        interior = np.flatnonzero(inside)
+        idx = np.concatenate([interior, edge])
+        order = np.argsort(idx, kind='stable')
+        layout_parts = np.concatenate([layout_cells[interior], edge_layout])[order]
+        actual_parts = np.concatenate([
+            self.cell_boxes(cx[interior], cy[interior], actual_tile_width, actual_tile_height), edge_actual
+        ])[order]
+        is_full = np.concatenate([np.ones(len(interior), dtype=bool), edge_full])[order]
+
+        print(f"  Interior fast path: {len(interior)} full tiles, {len(edge)} boundary tiles clipped")
+        return zip(idx[order].tolist(), actual_parts, layout_parts, is_full.tolist())
+
+    def cell_boxes(self, cx, cy, width, height):
+        """Axis-aligned boxes centred on (cx, cy), with the same vertex order as the loop engine.
+
+        shapely.box starts its rings at a different corner, which gives equal but
+        differently ordered intersection results, so the rings are built directly.
+        """
+        return self.rect_polygons(cx - width / 2, cy - height / 2, cx + width / 2, cy + height / 2)
+
+    def rect_polygons(self, x0, y0, x1, y1):
+        """Rectangles from corner arrays, ring starting at (x0, y0) like cell_boxes"""
+        rings = np.stack([
+            np.column_stack([x0, y0]), np.column_stack([x1, y0]),
+            np.column_stack([x1, y1]), np.column_stack([x0, y1]),
+            np.column_stack([x0, y0])
+        ], axis=1)
+        return shapely.polygons(rings)
+
+    def rectilinear_slabs(self, room_poly):
+        """Decompose a rectilinear room into disjoint rectangles (slab decomposition).
+
+        The room is cut into horizontal slabs at every vertex y; the vertical
+        edges crossing a slab give its covered x intervals (even-odd, so holes
+        work too). Consecutive slabs with the same intervals are merged.
+        Returns (rects, straight_vertices): an (n, 4) array of x0, y0, x1, y1 and
+        the vertices lying in the middle of a straight wall (GEOS keeps those in
+        clipped pieces), or None if any edge is not exactly horizontal or vertical.
+        """
+        if room_poly.is_empty or room_poly.geom_type not in ('Polygon', 'MultiPolygon'):
+            return None
+
+        rings = shapely.get_rings(shapely.get_parts(room_poly))
+        vertical = []
+        ys = []
+        straight = []
+        for ring in rings:
+            coords = shapely.get_coordinates(ring)
+            a, b = coords[:-1], coords[1:]
+            is_vertical = a[:, 0] == b[:, 0]
+            if not (is_vertical | (a[:, 1] == b[:, 1])).all():
+                return None
+            # A vertex between two edges running the same way is not a corner
+            straight.append(a[is_vertical == np.roll(is_vertical, 1)])
+            edges = is_vertical & (a[:, 1] != b[:, 1])
+            vertical.append(np.column_stack([a[edges, 0], np.minimum(a[edges, 1], b[edges, 1]),
+                                             np.maximum(a[edges, 1], b[edges, 1])]))
+            ys.append(coords[:, 1])
+        vertical = np.concatenate(vertical)
+        ys = np.unique(np.concatenate(ys))
+
+        # Vertical edges crossing the middle of each slab
+        mids = (ys[:-1] + ys[1:]) / 2
+        crossing = (vertical[None, :, 1] < mids[:, None]) & (vertical[None, :, 2] > mids[:, None])
+
+        rects = []
+        open_rects = []
+        previous = None
+        for s in range(len(mids)):
+            xs = np.sort(vertical[crossing[s], 0])
+            if len(xs) % 2:
+                return None
+            intervals = xs.reshape(-1, 2)
+            if previous is not None and np.array_equal(intervals, previous):
+                # Same x intervals as the slab below: grow those rectangles upwards
+                for rect in open_rects:
+                    rect[3] = ys[s + 1]
+                continue
+            rects.extend(open_rects)
+            open_rects = [[x0, ys[s], x1, ys[s + 1]] for x0, x1 in intervals if x1 > x0]
+            previous = intervals
+        rects.extend(open_rects)
+
+        return np.array(rects, dtype=float).reshape(-1, 4), np.concatenate(straight)
+
+    def rectilinear_pieces(self, rects, cx, cy, width, height, straight_vertices=None):
+        """Clip boxes centred on (cx, cy) against the room rectangles with interval arithmetic.
+
+        No geometry is built. Returns per box: the number of rectangles it
+        overlaps with positive area, whether it touches the room at all, the
+        bounds (x0, y0, x1, y1) and area of the overlap, and whether that
+        overlap is a single rectangle with no straight-wall vertex on it (so
+        the bounds describe the piece exactly).
+        """
+        x0, x1 = cx - width / 2, cx + width / 2
+        y0, y1 = cy - height / 2, cy + height / 2
+        ix0 = np.maximum(x0[:, None], rects[None, :, 0])
+        iy0 = np.maximum(y0[:, None], rects[None, :, 1])
+        ix1 = np.minimum(x1[:, None], rects[None, :, 2])
+        iy1 = np.minimum(y1[:, None], rects[None, :, 3])
+        w, h = ix1 - ix0, iy1 - iy0
+        overlap = (w > 0) & (h > 0)
+        touches = ((w >= 0) & (h >= 0)).any(axis=1)
+        count = overlap.sum(axis=1)
+
+        bounds = np.column_stack([
+            np.where(overlap, ix0, np.inf).min(axis=1), np.where(overlap, iy0, np.inf).min(axis=1),
+            np.where(overlap, ix1, -np.inf).max(axis=1), np.where(overlap, iy1, -np.inf).max(axis=1)
+        ])
+        # Pieces of several slabs form one rectangle when they fill their bounding box
+        area = np.where(overlap, w * h, 0).sum(axis=1)
+        bbox_area = np.where(count > 0, (bounds[:, 2] - bounds[:, 0]) * (bounds[:, 3] - bounds[:, 1]), 0)
+        single = (count > 0) & (np.abs(area - bbox_area) <= 1e-9 * bbox_area)
+        if straight_vertices is not None and len(straight_vertices):
+            px, py = straight_vertices[None, :, 0], straight_vertices[None, :, 1]
+            single &= ~((px >= bounds[:, 0:1]) & (px <= bounds[:, 2:3]) &
+                        (py >= bounds[:, 1:2]) & (py <= bounds[:, 3:4])).any(axis=1)
+        return count, touches, bounds, single, area
+
+    def clip_cells_analytic(self, room_poly, slabs, cell_x, cell_y, layout_tw, layout_th,
+                            actual_tile_width, actual_tile_height):
+        """Clip cells against a rectilinear room given as slab rectangles.
+
+        Same filters and results as clip_cells_vectorized. Pieces that are a
+        single rectangle are built straight from their interval bounds; only
+        cells whose piece is not a rectangle (around a corner of the room, or
+        holding a straight-wall vertex) or that merely touch the room go
+        through GEOS intersection.
+        """
+        rects, straight_vertices = slabs
+        cx = np.asarray(cell_x, dtype=float)
+        cy = np.asarray(cell_y, dtype=float)
+        if len(cx) == 0 or layout_tw <= 0 or layout_th <= 0:
+            return []
+
+        # Layout cells (with grout) must overlap the room with positive area
+        layout_count, _, layout_bounds, layout_single, _ = self.rectilinear_pieces(
+            rects, cx, cy, layout_tw, layout_th, straight_vertices
+        )
+        keep = np.flatnonzero(layout_count > 0)
+        layout_bounds, layout_single = layout_bounds[keep], layout_single[keep]
+        # Actual tiles (factory size) of those cells must still touch the room
+        _, actual_touches, actual_bounds, actual_single, _ = self.rectilinear_pieces(
+            rects, cx[keep], cy[keep], actual_tile_width, actual_tile_height, straight_vertices
+        )
+        layout_bounds, layout_single = layout_bounds[actual_touches], layout_single[actual_touches]
+        actual_bounds, actual_single = actual_bounds[actual_touches], actual_single[actual_touches]
+        keep = keep[actual_touches]
+        if len(keep) == 0:
+            return []
+
+        layout_parts = np.empty(len(keep), dtype=object)
+        actual_parts = np.empty(len(keep), dtype=object)
+
+        # Rectangular pieces straight from their bounds
+        layout_parts[layout_single] = self.rect_polygons(*layout_bounds[layout_single].T)
+        actual_parts[actual_single] = self.rect_polygons(*actual_bounds[actual_single].T)
+
+        # Everything else is clipped by GEOS
+        shapely.prepare(room_poly)
+        odd_layout = np.flatnonzero(~layout_single)
+        layout_parts[odd_layout] = shapely.intersection(
+            self.cell_boxes(cx[keep[odd_layout]], cy[keep[odd_layout]], layout_tw, layout_th), room_poly
+        )
+        odd_actual = np.flatnonzero(~actual_single)
+        actual_parts[odd_actual] = shapely.intersection(
+            self.cell_boxes(cx[keep[odd_actual]], cy[keep[odd_actual]], actual_tile_width, actual_tile_height),
+            room_poly
+        )
+
+        # A tile is full when its single-rectangle piece is the whole tile
+        half_w, half_h = actual_tile_width / 2, actual_tile_height / 2
+        is_full = (actual_single &
+                   (actual_bounds[:, 0] == cx[keep] - half_w) & (actual_bounds[:, 1] == cy[keep] - half_h) &
+                   (actual_bounds[:, 2] == cx[keep] + half_w) & (actual_bounds[:, 3] == cy[keep] + half_h))
+
+        print(f"  Analytic clipping: {int(is_full.sum())} full tiles, "
+              f"{len(odd_layout) + len(odd_actual)} pieces clipped by GEOS")
+        return zip(keep.tolist(), actual_parts, layout_parts, is_full.tolist())
+
     def generate_tiles_for_all_rooms(self, room_df, apartment_orientations, start_points=None,
                                     stagger_percent=0, stagger_direction='x',
-                                    grout_thickness=3, sp_includes_grout=True, tile_width=600, tile_height=600):
-        """Process all rooms to generate tiles with explicit grout spacing"""
+                                    grout_thickness=3, sp_includes_grout=True, tile_width=600, tile_height=600,
+                                    reuse_tiles=None, workers=None, start_offsets=None, tile_cache=None):
+        """Process all rooms to generate tiles with explicit grout spacing.
+
+        reuse_tiles maps room_id to already generated tiles (e.g. rooms unchanged
+        by a drawing revision); those rooms are not tiled again. With more than
+        one worker, rooms are tiled in a process pool; results are merged in
+        room_df order either way. start_offsets maps room_id to a (dx, dy) shift
+        of the room's start point (e.g. adopted from optimize_start_offsets).
+        Rooms with the same layout key (see room_layout_key) are tiled once and
+        the tiles are placed on the other copies. tile_cache (a
+        services.tile_cache.TileCache) supplies the tiles of layouts tiled
+        before, and keeps the new ones.
+        """
         print("🔄 Processing tiles for all rooms...")
+        reuse_tiles = reuse_tiles or {}
+        start_offsets = start_offsets or {}
+        workers = workers or self.workers
 
-        apartments_data = {}
+        # Start point of each room (the first SP assigned to it wins)
+        sp_by_room = {}
+        for sp in start_points or []:
+            if 'room_id' in sp:
+                sp_by_room.setdefault(sp['room_id'], sp)
+
+        # Orientation of each apartment (the first row for a name wins)
+        orientations = {}
+        for apartment_name, orientation in zip(apartment_orientations['apartment_name'],
+                                               apartment_orientations['orientation']):
+            orientations.setdefault(apartment_name, normalize_orientation(orientation))
 
+        rooms = []
+        jobs = []
+        layouts = {}  # room_id -> (layout key, frame)
+        sources = {}  # layout key -> (tiles, frame) of the room they were laid in
+        queued = set()  # layout keys of the rooms that are tiled
         for _, room in room_df.iterrows():
             apartment_name = room['apartment_name']
-            room_name = room['room_name']
             room_id = room['room_id']
-            room_poly = room['polygon']
 
-            # Get orientation for this apartment
-            orientation = apartment_orientations[
-                apartment_orientations['apartment_name'] == apartment_name
-            ]['orientation'].values[0]
-
-            # Find start point and tile size for this room
-            start_point = None
-            tile_size = (tile_width, tile_height)  # Use provided default
-            if start_points:
-                for sp in start_points:
-                    if 'room_id' in sp and sp['room_id'] == room_id:
-                        start_point = Point(sp['centroid'])
-                        tile_size = (sp['width'], sp['height'])
-                        break
-
-            tiles = self.generate_tile_grid(
-                room_poly, orientation, start_point, tile_size, 
-                stagger_percent, stagger_direction, room_id, 
-                grout_thickness, sp_includes_grout
+            orientation = orientations[apartment_name]
+            rooms.append((apartment_name, orientation, room_id))
+
+            # Reused tiles were laid from the unshifted start point
+            if room_id in reuse_tiles and room_id not in start_offsets:
+                continue
+
+            start_point, tile_size = self.room_start_point(
+                room, sp_by_room.get(room_id), start_offsets, (tile_width, tile_height)
             )
 
-            # Store tiles
+            key, frame = self.room_layout_key(room['polygon'], start_point, {
+                'orientation': orientation,
+                'tile_size': tile_size,
+                'stagger_percent': stagger_percent,
+                'stagger_direction': stagger_direction if stagger_percent > 0 else None,
+                'grout_thickness': grout_thickness,
+                'sp_includes_grout': sp_includes_grout
+            }, translate=self.dedup != 'off',
+               mirror=self.dedup == 'mirror' and stagger_percent <= 0 and is_axis_aligned(orientation))
+            layouts[room_id] = (key, frame)
+
+            # Copies of a layout already queued (or cached) are placed after tiling
+            if key in sources or key in queued:
+                continue
+            if tile_cache is not None:
+                cached = tile_cache.get(key)
+                if cached is not None:
+                    sources[key] = cached
+                    continue
+
+            queued.add(key)
+            jobs.append((
+                room_id, room['polygon'].wkb, orientation, start_point, tile_size,
+                stagger_percent, stagger_direction, grout_thickness, sp_includes_grout, self.engine
+            ))
+
+        print(f"♻️ {len(layouts)} rooms: {len(jobs)} to tile, {len(layouts) - len(jobs)} placed from "
+              f"repeated or cached layouts ({len(sources)} tile cache hits)")
+        tiled = self.run_tiling_jobs(jobs, workers)
+        for room_id, tiles in tiled.items():
+            key, frame = layouts[room_id]
+            sources[key] = (tiles, frame)
+            if tile_cache is not None:
+                tile_cache.put(key, tiles, frame)
+
+        tiles_by_room = {room_id: tiles for room_id, tiles in reuse_tiles.items() if room_id not in start_offsets}
+        for room_id, (key, frame) in layouts.items():
+            tiles, source_frame = sources[key]
+            tiles_by_room[room_id] = tiles if room_id in tiled else self.place_tiles(tiles, source_frame, frame, room_id)
+
+        # Store tiles
+        apartments_data = {}
+        for apartment_name, orientation, room_id in rooms:
             if apartment_name not in apartments_data:
                 apartments_data[apartment_name] = {
                     'orientation': orientation,
                     'tiles': []
                 }
-            apartments_data[apartment_name]['tiles'].extend(tiles)
+            apartments_data[apartment_name]['tiles'].extend(tiles_by_room[room_id])
 
         total_tiles = sum(len(apt_data['tiles']) for apt_name, apt_data in apartments_data.items())
         print(f"✅ Processed {len(apartments_data)} apartments with {total_tiles} total tiles")
         
         return apartments_data
 
+    def room_start_point(self, room, sp=None, start_offsets=None, default_tile_size=(600, 600)):
+        """Start point and tile size a room is laid from: its SP (if any), shifted by its adopted offset"""
+        start_point = None
+        tile_size = default_tile_size
+        if sp is not None:
+            start_point = tuple(sp['centroid'])
+            tile_size = (sp['width'], sp['height'])
+
+        # Shifted start point (the room centroid is the anchor when there is no SP)
+        if start_offsets and room['room_id'] in start_offsets:
+            dx, dy = start_offsets[room['room_id']]
+            if start_point is None:
+                centroid = room['polygon'].centroid
+                start_point = (centroid.x, centroid.y)
+            start_point = (start_point[0] + dx, start_point[1] + dy)
+        return start_point, tile_size
+
+    def room_layout_key(self, room_poly, start_point, params, translate=True, mirror=False):
+        """Key of a room's tiling that doesn't depend on where the room is drawn.
+
+        The room and its start point are moved so the room's bounds start at
+        (0, 0) and rounded to 1e-6 mm; with mirror, the mirrored variants are
+        tried too and the smallest one is used (mirroring commutes with the
+        tile grid only for 0° / 90° without stagger). The key hashes that
+        shape with the layout params. Returns (key, frame), frame being
+        (ox, oy, fx, fy) with x = ox + fx * x' from canonical to drawing
+        coordinates, for place_tiles.
+        """
+        minx, miny, maxx, maxy = room_poly.bounds
+        best = None
+        for fx, fy in ([(1, 1), (-1, 1), (1, -1), (-1, -1)] if mirror else [(1, 1)]):
+            ox = (minx if fx == 1 else maxx) if translate else 0.0
+            oy = (miny if fy == 1 else maxy) if translate else 0.0
+            origin, flip = np.array([ox, oy]), np.array([fx, fy])
+            # + 0.0 turns -0.0 into 0.0 so both give the same WKB
+            shape = shapely.normalize(shapely.transform(room_poly, lambda c: np.round((c - origin) * flip, 6) + 0.0))
+            sp = None if start_point is None else (np.round((np.asarray(start_point[:2]) - origin) * flip, 6) + 0.0).tolist()
+            blob = shapely.to_wkb(shape) + json.dumps({'start_point': sp, 'params': params},
+                                                      sort_keys=True, default=float).encode('utf-8')
+            if best is None or blob < best[0]:
+                best = (blob, (ox, oy, fx, fy))
+        return hashlib.sha256(best[0]).hexdigest(), best[1]
+
+    def place_tiles(self, tiles, source_frame, target_frame, room_id):
+        """Copy tiles laid in one room onto another room with the same layout key.
+
+        Both frames map the shared canonical shape onto their room, so the
+        tiles move by a translation (plus a mirror for rooms of opposite
+        hand) applied to all their geometries at once.
+        """
+        sx, sy, sfx, sfy = source_frame
+        tx, ty, tfx, tfy = target_frame
+        flip = (int(sfx * tfx), int(sfy * tfy))
+        offset = (tx - flip[0] * sx, ty - flip[1] * sy)
+        if flip == (1, 1) and offset == (0, 0):
+            return [dict(tile, room_id=room_id) for tile in tiles]
+
+        polygons = np.empty(len(tiles), dtype=object)
+        layout_polygons = np.empty(len(tiles), dtype=object)
+        polygons[:] = [tile['polygon'] for tile in tiles]
+        layout_polygons[:] = [tile['layout_polygon'] for tile in tiles]
+        polygons = mirror_translate_geometries(polygons, flip, offset).tolist()
+        layout_polygons = mirror_translate_geometries(layout_polygons, flip, offset).tolist()
+        return [dict(
+            tile,
+            polygon=polygon,
+            layout_polygon=layout_polygon,
+            room_id=room_id,
+            centroid=(flip[0] * tile['centroid'][0] + offset[0], flip[1] * tile['centroid'][1] + offset[1]),
+            grid_position=(flip[0] * tile['grid_position'][0], flip[1] * tile['grid_position'][1])
+        ) for tile, polygon, layout_polygon in zip(tiles, polygons, layout_polygons)]
+
+    def process_pool(self, workers):
+        """The shared tiling pool, (re)created when the worker count changes.
+
+        Workers are started with 'spawn': forking a multi-threaded server
+        process can copy locks held by other threads and deadlock the child.
+        """
+        with self._pool_lock:
+            if self._pool is None or self._pool_workers != workers:
+                if self._pool is not None:
+                    self._pool.shutdown(wait=False)
+                self._pool = ProcessPoolExecutor(max_workers=workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+                self._pool_workers = workers
+            return self._pool
+
+    def discard_process_pool(self, pool):
+        """Drop a broken pool so the next call starts a new one"""
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+                self._pool_workers = 0
+        pool.shutdown(wait=False)
+
+    def run_tiling_jobs(self, jobs, workers=1):
+        """Tile rooms in the shared process pool (or serially), returning {room_id: tiles}"""
+        if workers > 1 and len(jobs) > 1:
+            pool = None
+            try:
+                print(f"⚡ Tiling {len(jobs)} rooms with {workers} worker processes...")
+                pool = self.process_pool(workers)
+                # map() yields in submission order, so the merge is deterministic
+                results = list(pool.map(tile_room_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+                return dict(zip([job[0] for job in jobs], results))
+            except (OSError, BrokenProcessPool, pickle.PicklingError) as e:
+                print(f"⚠️ Process pool unavailable ({e}), tiling rooms serially")
+                if pool is not None and isinstance(e, (OSError, BrokenProcessPool)):
+                    self.discard_process_pool(pool)
+
+        return {job[0]: tile_room_job(job) for job in jobs}
+
+    def generate_tiles_by_level(self, room_df, apartment_orientations, start_points=None,
+                                stagger_percent=0, stagger_direction='x',
+                                grout_thickness=3, sp_includes_grout=True, tile_width=600, tile_height=600,
+                                reuse_tiles=None, start_offsets=None, tile_cache=None):
+        """Tile the rooms of all levels (floor plates) in one pass, in level order.
+
+        Levels are not tiled separately: repeated floors are only tiled once when
+        all levels are deduplicated together, and the process pool (TILE_WORKERS)
+        already spreads the rooms of every level over the cores.
+        """
+        if 'level_index' in room_df.columns:
+            room_df = room_df.sort_values('level_index', kind='stable')
+        return self.generate_tiles_for_all_rooms(
+            room_df, apartment_orientations, start_points, stagger_percent, stagger_direction,
+            grout_thickness, sp_includes_grout, tile_width, tile_height, reuse_tiles=reuse_tiles,
+            start_offsets=start_offsets, tile_cache=tile_cache
+        )
+
+    def search_start_offsets(self, room_poly, orientation=0, start_point=None, tile_size=(600, 600),
+                             stagger_percent=0, stagger_direction='x', grout_thickness=3,
+                             sp_includes_grout=True, steps=40, sliver_threshold=10, max_cells=200000):
+        """Score candidate (dx, dy) shifts of a room's start point.
+
+        Offsets sample one period of the tile pattern on a steps x steps grid
+        (0, 0 = the current start point). Each offset is scored by the number
+        of cut tiles, slivers (cut side under sliver_threshold mm, as in step 6),
+        pieces under half a tile and waste (m², factory tile area minus the cut
+        piece, over cut tiles).
+        Rectangular rooms without stagger are scored with separable 1D interval
+        arithmetic. Other rectilinear rooms are measured with interval arithmetic
+        against their slab rectangles and any other room with batched vectorized
+        clipping, both on a coarser grid so at most max_cells cells are measured.
+        Offsets are in drawing coordinates. Returns a DataFrame with a 'pareto' column marking the
+        non-dominated offsets.
+        """
+        orientation = normalize_orientation(orientation)
+        layout_tw, layout_th, actual_w, actual_h = self.layout_tile_sizes(tile_size, grout_thickness, sp_includes_grout)
+        if start_point is None:
+            centroid = room_poly.centroid
+            sx, sy = centroid.x, centroid.y
+        elif isinstance(start_point, Point):
+            sx, sy = start_point.x, start_point.y
+        else:
+            sx, sy = start_point[0], start_point[1]
+
+        # Work in the tile frame: swap sizes for 90°, rotate the room for off-axis angles
+        frame_room = room_poly
+        if not is_axis_aligned(orientation):
+            frame_room = rotate_geometries(room_poly, -orientation, (sx, sy))
+        elif orientation == 90:
+            layout_tw, layout_th = layout_th, layout_tw
+            actual_w, actual_h = actual_h, actual_w
+            stagger_direction = 'y' if stagger_direction == 'x' else 'x'
+        if stagger_percent <= 0:
+            stagger_direction = None
+
+        # The pattern repeats every cell, or every two cells across a stagger
+        period_x = layout_tw * (2 if stagger_direction == 'y' else 1)
+        period_y = layout_th * (2 if stagger_direction == 'x' else 1)
+
+        minx, miny, maxx, maxy = frame_room.bounds
+        rectangular = (stagger_direction is None and
+                       abs((maxx - minx) * (maxy - miny) - frame_room.area) <= 1e-6 * frame_room.area)
+        slabs = None if rectangular else self.rectilinear_slabs(frame_room)
+        if not rectangular:
+            cells_per_offset = ((maxx - minx) / layout_tw + 4) * ((maxy - miny) / layout_th + 4)
+            steps = min(steps, max(2, int(math.sqrt(max_cells / cells_per_offset))))
+
+        # Offsets wrapped into (-period/2, period/2] so (0, 0) is always a candidate
+        shifts = np.arange(steps) / steps
+        dx_axis = (shifts * period_x + period_x / 2) % period_x - period_x / 2
+        dy_axis = (shifts * period_y + period_y / 2) % period_y - period_y / 2
+        dx, dy = (grid.ravel() for grid in np.meshgrid(dx_axis, dy_axis, indexing='ij'))
+
+        if rectangular:
+            metrics = self.offset_metrics_separable(
+                (minx, miny, maxx, maxy), sx + dx, sy + dy, layout_tw, layout_th, actual_w, actual_h, sliver_threshold
+            )
+        else:
+            metrics = self.offset_metrics_vectorized(
+                frame_room, sx + dx, sy + dy, layout_tw, layout_th, actual_w, actual_h,
+                stagger_percent, stagger_direction, sliver_threshold, slabs
+            )
+        method = 'separable' if rectangular else 'analytic' if slabs is not None else 'vectorized'
+        print(f"  Scored {len(dx)} start point offsets ({method})")
+
+        # Offsets back into drawing coordinates
+        if not is_axis_aligned(orientation):
+            theta = math.radians(orientation)
+            dx, dy = dx * math.cos(theta) - dy * math.sin(theta), dx * math.sin(theta) + dy * math.cos(theta)
+
+        offsets_df = pd.DataFrame({'dx': dx, 'dy': dy, **metrics})
+        offsets_df['waste_m2'] = offsets_df['waste_m2'] / 1000000
+        offsets_df['shift'] = np.hypot(offsets_df['dx'], offsets_df['dy'])
+        offsets_df['pareto'] = self.pareto_front(offsets_df[['cut_tiles', 'sliver_tiles', 'waste_m2']].to_numpy())
+        return offsets_df
+
+    def offset_metrics_separable(self, room_bounds, anchor_x, anchor_y, layout_tw, layout_th,
+                                 actual_w, actual_h, sliver_threshold=10):
+        """Cut, sliver and waste totals for a rectangular room at many anchors, axis by axis.
+
+        Every piece of a rectangle is the product of a column interval and a row
+        interval, so per-axis cut widths are enough: counts over pieces are
+        products of per-axis counts.
+        """
+        minx, miny, maxx, maxy = room_bounds
+
+        def axis(anchors, lo, hi, pitch, size):
+            # Cells k with centers anchor + k * pitch that can overlap [lo, hi]
+            k = np.arange(math.floor((lo - anchors.max()) / pitch) - 1, math.ceil((hi - anchors.min()) / pitch) + 2)
+            centers = anchors[:, None] + k[None, :] * pitch
+            cut = np.clip(np.minimum(centers + size / 2, hi) - np.maximum(centers - size / 2, lo), 0, None)
+            present = cut > 0
+            full = present & (centers - size / 2 >= lo - 1e-9) & (centers + size / 2 <= hi + 1e-9)
+            # Step 5 treats a side within 1% of the tile as uncut; slivers use the rounded cut side
+            near_full = present & (np.abs(cut - size) <= 0.01 * size)
+            sliver = present & ~near_full & (np.round(cut) < sliver_threshold)
+            # Only the cells across the two room edges can be cut (0 = no such cell)
+            partial = np.sort(np.where(present & ~full, cut, 0), axis=1)[:, -2:]
+            return (present.sum(1), full.sum(1), near_full.sum(1), sliver.sum(1), cut.sum(1), partial)
+
+        cols, cols_full, cols_near, cols_sliver, cut_w, part_w = axis(anchor_x, minx, maxx, layout_tw, actual_w)
+        rows, rows_full, rows_near, rows_sliver, cut_h, part_h = axis(anchor_y, miny, maxy, layout_th, actual_h)
+
+        tiles = cols * rows
+        full_tiles = cols_full * rows_full
+        cut_tiles = tiles - full_tiles
+        # A piece is a sliver if its cut side is short: one short side next to an uncut
+        # side, or either side short when both are cut
+        cols_cut, rows_cut = cols - cols_near, rows - rows_near
+        sliver_tiles = (cols_near * rows_sliver + cols_sliver * rows_near +
+                        cols_cut * rows_cut - (cols_cut - cols_sliver) * (rows_cut - rows_sliver))
+        tile_area = actual_w * actual_h
+        waste = cut_tiles * tile_area - (cut_w * cut_h - full_tiles * tile_area)
+
+        # Pieces under half a tile: a cut column or row against an uncut one, or two cut sides
+        half_area = tile_area / 2 - 1e-6
+
+        def under_half(areas):
+            return ((areas > 0) & (areas < half_area)).sum(axis=-1)
+
+        corner_areas = (part_w[:, :, None] * part_h[:, None, :]).reshape(len(part_w), -1)
+        under_half_tiles = (cols_full * under_half(part_h * actual_w) + rows_full * under_half(part_w * actual_h) +
+                            under_half(corner_areas))
+        return {'tiles': tiles, 'full_tiles': full_tiles, 'cut_tiles': cut_tiles,
+                'sliver_tiles': sliver_tiles, 'under_half_tiles': under_half_tiles, 'waste_m2': waste}
+
+    def offset_metrics_vectorized(self, room_poly, anchor_x, anchor_y, layout_tw, layout_th, actual_w, actual_h,
+                                  stagger_percent=0, stagger_direction=None, sliver_threshold=10, slabs=None,
+                                  max_dense=1000000):
+        """Cut, sliver and waste totals at many anchors, clipping their cells in batches.
+
+        Offsets are processed in chunks of at most max_dense (offset, cell) pairs.
+        With slabs (from rectilinear_slabs) the pieces are measured by interval
+        arithmetic, without building any geometry.
+        """
+        anchor_x, anchor_y = np.asarray(anchor_x, dtype=float), np.asarray(anchor_y, dtype=float)
+        n = len(anchor_x)
+        minx, miny, maxx, maxy = room_poly.bounds
+
+        # Grid relative to the anchor, shared by all offsets (stagger shifts depend on row / column only);
+        # it covers the room bounds from every anchor plus about two tiles
+        stagger_size = (layout_tw if stagger_direction == 'x' else layout_th) * stagger_percent
+        cell_x, cell_y, _, _ = self.grid_cell_centers(
+            0, 0, layout_tw, layout_th,
+            int((anchor_x.max() - minx) / layout_tw) + 3, int((maxx - anchor_x.min()) / layout_tw) + 3,
+            int((anchor_y.max() - miny) / layout_th) + 3, int((maxy - anchor_y.min()) / layout_th) + 3,
+            stagger_size, stagger_percent, stagger_direction or 'x'
+        )
+        cell_x, cell_y = np.asarray(cell_x), np.asarray(cell_y)
+
+        if slabs is None:
+            shapely.prepare(room_poly)
+        metrics = {name: np.zeros(n, dtype=int) for name in
+                   ['full_tiles', 'cut_tiles', 'sliver_tiles', 'under_half_tiles']}
+        metrics['waste_m2'] = np.zeros(n)
+        chunk = max(1, max_dense // max(1, len(cell_x)))
+        for first in range(0, n, chunk):
+            offsets = slice(first, first + chunk)
+            for name, values in self.offset_chunk_metrics(
+                room_poly, anchor_x[offsets], anchor_y[offsets], cell_x, cell_y,
+                actual_w, actual_h, sliver_threshold, slabs
+            ).items():
+                metrics[name][offsets] = values
+
+        metrics['tiles'] = metrics['full_tiles'] + metrics['cut_tiles']
+        return {name: metrics[name] for name in
+                ['tiles', 'full_tiles', 'cut_tiles', 'sliver_tiles', 'under_half_tiles', 'waste_m2']}
+
+    def offset_chunk_metrics(self, room_poly, anchor_x, anchor_y, cell_x, cell_y,
+                             actual_w, actual_h, sliver_threshold=10, slabs=None):
+        """Metrics of offset_metrics_vectorized for one chunk of anchors"""
+        n = len(anchor_x)
+        minx, miny, maxx, maxy = room_poly.bounds
+        cx = anchor_x[:, None] + cell_x[None, :]
+        cy = anchor_y[:, None] + cell_y[None, :]
+
+        # Cells whose actual tile box overlaps the room's bounding box
+        near = ((cx + actual_w / 2 > minx) & (cx - actual_w / 2 < maxx) &
+                (cy + actual_h / 2 > miny) & (cy - actual_h / 2 < maxy))
+        owner = np.nonzero(near)[0]
+        cx, cy = cx[near], cy[near]
+
+        if slabs is not None:
+            rects = slabs[0]
+            full = np.zeros(len(cx), dtype=bool)
+            cut = np.zeros(len(cx), dtype=bool)
+            bounds = np.empty((len(cx), 4))
+            piece_area = np.empty(len(cx))
+            chunk = max(1, 2000000 // max(1, len(rects)))
+            for start in range(0, len(cx), chunk):
+                part = slice(start, start + chunk)
+                count, _, bounds[part], single, piece_area[part] = self.rectilinear_pieces(
+                    rects, cx[part], cy[part], actual_w, actual_h
+                )
+                full[part] = (single &
+                              (bounds[part, 0] == cx[part] - actual_w / 2) & (bounds[part, 1] == cy[part] - actual_h / 2) &
+                              (bounds[part, 2] == cx[part] + actual_w / 2) & (bounds[part, 3] == cy[part] + actual_h / 2))
+                cut[part] = (count > 0) & ~full[part]
+            edge = np.flatnonzero(cut)
+            bounds, piece_area = bounds[edge], piece_area[edge]
+        else:
+            boxes = self.cell_boxes(cx, cy, actual_w, actual_h)
+            full = shapely.covers(room_poly, boxes)
+            edge = np.flatnonzero(~full & shapely.intersects(room_poly, boxes))
+            pieces = shapely.intersection(boxes[edge], room_poly)
+            piece_area = shapely.area(pieces)
+            keep = piece_area > 0
+            edge, pieces, piece_area = edge[keep], pieces[keep], piece_area[keep]
+            bounds = shapely.bounds(pieces)
+
+        # Cut side of each piece, as classified in step 5
+        width, height = bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1]
+        full_width = np.abs(width - actual_w) <= 0.01 * actual_w
+        full_height = np.abs(height - actual_h) <= 0.01 * actual_h
+        cut_side = np.where(full_width, height, np.where(full_height, width, np.minimum(width, height)))
+        sliver = ~(full_width & full_height) & (np.round(cut_side) < sliver_threshold)
+
+        return {
+            'full_tiles': np.bincount(owner[full], minlength=n),
+            'cut_tiles': np.bincount(owner[edge], minlength=n),
+            'sliver_tiles': np.bincount(owner[edge], weights=sliver, minlength=n).astype(int),
+            'under_half_tiles': np.bincount(owner[edge], weights=piece_area < actual_w * actual_h / 2 - 1e-6,
+                                            minlength=n).astype(int),
+            'waste_m2': np.bincount(owner[edge], weights=actual_w * actual_h - piece_area, minlength=n)
+        }
+
+    def pareto_front(self, scores):
+        """Mask of rows not dominated by another row (lower is better in every column)"""
+        scores = np.asarray(scores, dtype=float)
+        no_worse = (scores[None, :, :] <= scores[:, None, :]).all(axis=2)
+        better = (scores[None, :, :] < scores[:, None, :]).any(axis=2)
+        return ~(no_worse & better).any(axis=1)
+
+    def optimize_start_offsets(self, room_df, apartment_orientations, start_points=None,
+                               stagger_percent=0, stagger_direction='x', grout_thickness=3,
+                               sp_includes_grout=True, tile_width=600, tile_height=600,
+                               steps=40, sliver_threshold=10, max_options=5):
+        """Pareto-best start point offsets for every room.
+
+        Returns {room_id: {'current': metrics at (0, 0), 'options': up to
+        max_options non-dominated offsets}}, options ordered by slivers, cuts,
+        waste and then by the smallest shift. Offsets are in mm, in drawing
+        coordinates, and are applied with generate_tiles_for_all_rooms(start_offsets=...).
+        """
+        print(f"🔍 Searching start point offsets ({steps}x{steps} per room)...")
+        orientations = dict(zip(apartment_orientations['apartment_name'], apartment_orientations['orientation']))
+        sp_by_room = {}
+        for sp in start_points or []:
+            if 'room_id' in sp:
+                sp_by_room.setdefault(sp['room_id'], sp)
+
+        results = {}
+        for _, room in room_df.iterrows():
+            room_id = room['room_id']
+            sp = sp_by_room.get(room_id)
+            offsets_df = self.search_start_offsets(
+                room['polygon'], orientations.get(room['apartment_name'], 0),
+                tuple(sp['centroid']) if sp is not None else None,
+                (sp['width'], sp['height']) if sp is not None else (tile_width, tile_height),
+                stagger_percent, stagger_direction, grout_thickness, sp_includes_grout, steps, sliver_threshold
+            )
+            columns = ['dx', 'dy', 'tiles', 'full_tiles', 'cut_tiles', 'sliver_tiles', 'waste_m2']
+            current = offsets_df.loc[offsets_df['shift'].idxmin(), columns]
+            options = (offsets_df[offsets_df['pareto']]
+                       .sort_values(['sliver_tiles', 'cut_tiles', 'waste_m2', 'shift'])
+                       .drop_duplicates(['sliver_tiles', 'cut_tiles', 'waste_m2'])
+                       .head(max_options))
+            results[room_id] = {'current': current.to_dict(), 'options': options[columns].to_dict('records')}
+
+        improved = sum(1 for r in results.values()
+                       if r['options'] and (r['options'][0]['sliver_tiles'], r['options'][0]['cut_tiles']) <
+                       (r['current']['sliver_tiles'], r['current']['cut_tiles']))
+        print(f"✅ Better start point offsets found for {improved} of {len(results)} rooms")
+        return results
+
+    def resolve_auto_orientations(self, room_df, apartment_orientations, start_points=None,
+                                  stagger_percent=0, stagger_direction='x', grout_thickness=3,
+                                  sp_includes_grout=True, tile_width=600, tile_height=600,
+                                  start_offsets=None, candidates=(0, 90), sliver_threshold=10):
+        """Choose the orientation of apartments set to 'auto'.
+
+        Every room of the apartment is scored in each candidate orientation at the
+        start point it will be laid from, with the start point offset metrics
+        (interval arithmetic for rectilinear rooms, no tiles are generated). The
+        apartment takes the candidate with the fewest pieces under half a tile,
+        then the fewest cut tiles, then the least waste; ties keep the first
+        candidate. Returns the orientations DataFrame with 'auto' replaced and
+        the score table (one row per apartment and candidate, 'chosen' marking
+        the pick; empty when no apartment is set to 'auto').
+        """
+        auto = apartment_orientations['orientation'].astype(str).str.lower() == 'auto'
+        if not auto.any():
+            return apartment_orientations, pd.DataFrame()
+
+        print(f"🧭 Choosing orientations for {auto.sum()} apartments ({', '.join(f'{c}°' for c in candidates)})...")
+        sp_by_room = {}
+        for sp in start_points or []:
+            if 'room_id' in sp:
+                sp_by_room.setdefault(sp['room_id'], sp)
+
+        metrics = ['tiles', 'cut_tiles', 'under_half_tiles', 'sliver_tiles', 'waste_m2']
+        auto_names = set(apartment_orientations.loc[auto, 'apartment_name'])
+        scores = []
+        for apartment_name, rooms in room_df[room_df['apartment_name'].isin(auto_names)].groupby('apartment_name', sort=False):
+            for orientation in candidates:
+                totals = dict.fromkeys(metrics, 0)
+                for _, room in rooms.iterrows():
+                    start_point, tile_size = self.room_start_point(
+                        room, sp_by_room.get(room['room_id']), start_offsets, (tile_width, tile_height)
+                    )
+                    current = self.search_start_offsets(
+                        room['polygon'], orientation, start_point, tile_size, stagger_percent, stagger_direction,
+                        grout_thickness, sp_includes_grout, steps=1, sliver_threshold=sliver_threshold
+                    ).iloc[0]
+                    for metric in metrics:
+                        totals[metric] += current[metric]
+                scores.append({'apartment_name': apartment_name, 'orientation': orientation, 'rooms': len(rooms), **totals})
+
+        scores_df = pd.DataFrame(scores, columns=['apartment_name', 'orientation', 'rooms'] + metrics)
+        best = (scores_df.sort_values(['under_half_tiles', 'cut_tiles', 'waste_m2'], kind='stable')
+                .drop_duplicates('apartment_name'))
+        scores_df['chosen'] = scores_df.index.isin(best.index)
+        chosen = dict(zip(best['apartment_name'], best['orientation']))
+
+        # Apartments without rooms fall back to 0°
+        resolved = apartment_orientations.copy()
+        resolved['orientation'] = [chosen.get(name, candidates[0]) if is_auto else orientation
+                                   for name, orientation, is_auto in
+                                   zip(resolved['apartment_name'], resolved['orientation'], auto)]
+        for apartment_name, orientation in chosen.items():
+            print(f"  {apartment_name}: {orientation}°")
+        return resolved, scores_df
+
+    def measure_coverage(self, room_poly, tile_polys, find_gaps=True, min_gap_area=1.0):
+        """Coverage % of a room by its (clipped) tile polygons, and the uncovered gap polygons.
+
+        Tiles of one grid never overlap, so the covered area is the sum of tile
+        areas; a union is only built when that sum exceeds the room area (tiles
+        overlap) or when gaps are requested and the room isn't fully covered.
+        """
+        room_area = room_poly.area
+        if room_area <= 0:
+            return 0, []
+        if not tile_polys:
+            return 0, [room_poly] if find_gaps else []
+
+        tile_polys = np.asarray(tile_polys, dtype=object)
+        covered_area = shapely.area(tile_polys).sum()
+        union = None
+        if covered_area > room_area * (1 + 1e-9):
+            # Overlapping tiles: count shared area once
+            union = self.safe_union(tile_polys)
+            covered_area = union.area
+
+        gaps = []
+        if find_gaps and covered_area < room_area - min_gap_area:
+            union = union if union is not None else self.safe_union(tile_polys)
+            gaps = [gap for gap in shapely.get_parts(room_poly.difference(union)).tolist()
+                    if gap.area >= min_gap_area]
+
+        return (covered_area / room_area) * 100, gaps
+
+    def safe_union(self, polys):
+        """Cascaded union, repairing invalid inputs if GEOS rejects them"""
+        try:
+            return shapely.union_all(polys)
+        except shapely.errors.GEOSException:
+            return shapely.union_all(shapely.make_valid(polys))
+
     def verify_room_coverage(self, apartments_data, room_df):
-        """Verify that tiles completely cover each room"""
+        """Verify that tiles completely cover each room, and locate any uncovered gaps"""
         print("\n📋 Verifying room coverage...")
         
+        # Group tiles by room once instead of rescanning every apartment per room
+        tiles_by_room = {}
+        for apt_name, apt_data in apartments_data.items():
+            for tile in apt_data['tiles']:
+                tiles_by_room.setdefault(tile['room_id'], []).append(tile)
+        
         coverage_results = []
         
         for _, room in room_df.iterrows():
             room_id = room['room_id']
-            apartment_name = room['apartment_name']
-            room_name = room['room_name']
             room_poly = room['polygon']
-            room_area = room_poly.area
-            
-            # Get all tiles for this room
-            room_tiles = []
-            for apt_name, apt_data in apartments_data.items():
-                for tile in apt_data['tiles']:
-                    if tile['room_id'] == room_id:
-                        room_tiles.append(tile)
+            room_tiles = tiles_by_room.get(room_id, [])
             
-            # Calculate coverage
-            combined_tiles = None
-            if room_tiles:
-                for tile in room_tiles:
-                    poly = tile.get('layout_polygon', tile['polygon'])
-                    if combined_tiles is None:
-                        combined_tiles = poly
-                    else:
-                        try:
-                            combined_tiles = combined_tiles.union(poly)
-                        except:
-                            try:
-                                combined_tiles = combined_tiles.buffer(0).union(poly.buffer(0))
-                            except:
-                                continue
-                
-                if combined_tiles:
-                    coverage_pct = (combined_tiles.area / room_area) * 100
-                else:
-                    coverage_pct = 0
-            else:
-                coverage_pct = 0
+            coverage_pct, gaps = self.measure_coverage(
+                room_poly, [tile.get('layout_polygon', tile['polygon']) for tile in room_tiles]
+            )
             
             coverage_results.append({
                 'room_id': room_id,
-                'apartment_name': apartment_name,
-                'room_name': room_name,
-                'room_area': room_area,
+                'apartment_name': room['apartment_name'],
+                'room_name': room['room_name'],
+                'room_area': room_poly.area,
                 'coverage_pct': coverage_pct,
-                'tile_count': len(room_tiles)
+                'tile_count': len(room_tiles),
+                'gap_count': len(gaps),
+                'gap_area': sum(gap.area for gap in gaps),
+                'gaps': gaps
             })
         
         coverage_df = pd.DataFrame(coverage_results)
         print("\n📊 Room Coverage Results:")
-        display_dataframe(coverage_df, "Coverage Results")
+        display_dataframe(coverage_df.drop(columns='gaps'), "Coverage Results")
         
         # Check for low coverage
         low_coverage = coverage_df[coverage_df['coverage_pct'] < 99]
@@ -358,25 +1231,31 @@ class TileProcessor:
         
         print(f"✅ Using grout thickness: {grout_thickness} mm")
         
+        # Measure bounds (in each tile's own frame) and sides of every tile in one pass over a columnar TileSet
+        tile_set = TileSet.from_apartments(apartments_data)
+        polygonal = tile_set.polygonal()
+        bounds = tile_set.frame_bounds()
+        measured_widths = (bounds[:, 2] - bounds[:, 0]).tolist()
+        measured_heights = (bounds[:, 3] - bounds[:, 1]).tolist()
+        side_counts = tile_set.side_counts().tolist()
+        room_names = dict(zip(final_room_df['room_id'], final_room_df['room_name']))
+        
         # Process each apartment and its tiles
+        position = 0
         for apt_name, apt_data in apartments_data.items():
-            orientation = apt_data['orientation']
+            orientation = normalize_orientation(apt_data['orientation'])
             total_tiles += len(apt_data['tiles'])
             
             for tile_idx, tile in enumerate(apt_data['tiles']):
+                i = position + tile_idx
+                
                 # Get room information
                 room_id = tile['room_id']
+                room_name = room_names.get(room_id, f"Room {room_id}")
                 
-                # Find room in room_df
-                room_row = final_room_df[final_room_df['room_id'] == room_id]
-                if not room_row.empty:
-                    room_name = room_row['room_name'].values[0]
-                else:
-                    room_name = f"Room {room_id}"
-                
-                # Get polygon and measurements
+                # Skip missing and non-polygonal geometries
                 polygon = tile['polygon']
-                if polygon is None:
+                if not polygonal[i]:
                     continue
                     
                 # Get dimensions
@@ -385,26 +1264,10 @@ class TileProcessor:
                 actual_width = tile.get('actual_tile_width', width - grout_thickness)
                 actual_height = tile.get('actual_tile_height', height - grout_thickness)
                     
-                # Measured dimensions
-                if isinstance(polygon, Polygon):
-                    minx, miny, maxx, maxy = polygon.bounds
-                    measured_width = maxx - minx
-                    measured_height = maxy - miny
-                elif isinstance(polygon, MultiPolygon):
-                    minx, miny, maxx, maxy = polygon.bounds
-                    measured_width = maxx - minx
-                    measured_height = maxy - miny
-                else:
-                    continue
-                
-                # Count sides
-                if isinstance(polygon, Polygon):
-                    sides = len(list(polygon.exterior.coords)) - 1
-                elif isinstance(polygon, MultiPolygon):
-                    largest = max(polygon.geoms, key=lambda p: p.area)
-                    sides = len(list(largest.exterior.coords)) - 1
-                else:
-                    sides = 0
+                # Measured dimensions and side count (largest part for MultiPolygons)
+                measured_width = measured_widths[i]
+                measured_height = measured_heights[i]
+                sides = side_counts[i]
                 
                 # Apply apartment orientation to determine expected dimensions
                 if orientation == 90:
@@ -451,7 +1314,7 @@ class TileProcessor:
                             classification = 'cut_x' if measured_height <= measured_width else 'cut_y'
                             cut_side = min(round(measured_width), round(measured_height))
                     else:
-                        # Normal orientation (0, 180, 270 etc.) - original logic
+                        # Normal orientation (0, 180, 270 etc.; off-axis angles are measured in the tile frame)
                         if is_full_width:
                             # Full width, cut height
                             classification = 'cut_y'
@@ -498,6 +1361,8 @@ class TileProcessor:
                     'sides': sides,
                     'cut_side': cut_side if classification in ['cut_x', 'cut_y', 'all_cut'] else None
                 })
+            
+            position += len(apt_data['tiles'])
         
         # Convert to DataFrame
         tiles_df = pd.DataFrame(all_tiles)
@@ -1031,79 +1896,51 @@ class TileProcessor:
         """Analyze tile sizes and identify small tiles that might need attention"""
         print("\n🔍 Analyzing tile sizes...")
         
-        # Prepare data structure to collect all tile information
-        all_tiles = []
-        
-        # Process each apartment
-        for apt_name, apt_data in apartments_data.items():
-            # Get apartment orientation
-            apt_orientation = apt_data['orientation']
-            
-            # Process each tile
-            for tile_idx, tile in enumerate(apt_data['tiles']):
-                room_id = tile['room_id']
-                
-                # Get room name if available
-                room_name = f"Room {room_id}"
-                for _, room in final_room_df.iterrows():
-                    if room['room_id'] == room_id:
-                        room_name = room['room_name']
-                        break
-                
-                # Get tile attributes
-                polygon = tile['polygon']
-                tile_type = tile.get('type', 'unknown')
-                is_split = tile.get('is_split', False)
-                part_index = tile.get('part_index', None)
-                
-                # Calculate area
-                area = polygon.area
-                
-                # Calculate dimensions
-                try:
-                    minx, miny, maxx, maxy = polygon.bounds
-                    width = maxx - minx
-                    height = maxy - miny
-                    perimeter = polygon.length
-                    
-                    # Calculate compactness (normalized ratio of area to perimeter)
-                    # This helps identify stretched/irregular tiles
-                    compactness = 4 * math.pi * area / (perimeter * perimeter) if perimeter > 0 else 0
-                    
-                    # Create a unique ID for the tile
-                    if is_split:
-                        original_tile_idx = tile.get('original_tile_index', tile_idx)
-                        tile_id = f"{apt_name}-R{room_id}-T{original_tile_idx}-P{part_index}"
-                    else:
-                        tile_id = f"{apt_name}-R{room_id}-T{tile_idx}"
-                    
-                    # Store tile data
-                    tile_data = {
-                        'tile_id': tile_id,
-                        'apartment': apt_name,
-                        'room_id': room_id,
-                        'room_name': room_name,
-                        'tile_index': tile_idx,
-                        'area': area,
-                        'width': width,
-                        'height': height,
-                        'perimeter': perimeter,
-                        'compactness': compactness,
-                        'type': tile_type,
-                        'is_split': is_split,
-                        'part_index': part_index,
-                        'orientation': apt_orientation,
-                        'centroid_x': polygon.centroid.x,
-                        'centroid_y': polygon.centroid.y
-                    }
-                    
-                    all_tiles.append(tile_data)
-                    
-                except Exception as e:
-                    print(f"❌ Error processing tile {apt_name}-R{room_id}-T{tile_idx}: {e}")
-        
-        # Convert to DataFrame for analysis
-        tiles_df = pd.DataFrame(all_tiles)
+        # Measure every tile in one pass over a columnar TileSet and extend its pandas view
+        tile_set = TileSet.from_apartments(apartments_data)
+        tiles = [tile for apt_data in apartments_data.values() for tile in apt_data['tiles']]
+        tiles_df = tile_set.to_dataframe(include_geometry=False)
+        
+        room_names = dict(zip(final_room_df['room_id'], final_room_df['room_name'])) if not final_room_df.empty else {}
+        room_ids = tiles_df['room_id'].tolist()
+        tile_indexes = tiles_df['tile_index'].tolist()
+        is_split = [tile.get('is_split', False) for tile in tiles]
+        part_index = [tile.get('part_index', None) for tile in tiles]
+        
+        # Tile ids name the original tile (and part) for split tiles
+        tile_ids = [
+            f"{apt_name}-R{room_id}-T{tile.get('original_tile_index', tile_idx)}-P{part}" if split
+            else f"{apt_name}-R{room_id}-T{tile_idx}"
+            for apt_name, room_id, tile_idx, tile, split, part in zip(
+                tile_set.apartment_names.tolist(), room_ids, tile_indexes, tiles, is_split, part_index
+            )
+        ]
+        
+        # Dimensions, perimeter and compactness (normalized area-to-perimeter ratio, low for stretched tiles)
+        bounds = tile_set.bounds()
+        area = tile_set.areas()
+        perimeter = shapely.length(tile_set.polygons)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            compactness = np.where(perimeter > 0, 4 * math.pi * area / (perimeter * perimeter), 0)
+        centroids = shapely.centroid(tile_set.polygons)
+        
+        tiles_df = tiles_df.assign(
+            tile_id=tile_ids,
+            apartment=tiles_df['apartment_name'],
+            room_name=[room_names.get(room_id, f"Room {room_id}") for room_id in room_ids],
+            area=area,
+            width=bounds[:, 2] - bounds[:, 0],
+            height=bounds[:, 3] - bounds[:, 1],
+            perimeter=perimeter,
+            compactness=compactness,
+            type=tile_set.types(),
+            is_split=is_split,
+            part_index=part_index,
+            orientation=[apartments_data[apt_name]['orientation'] for apt_name in tile_set.apartment_names.tolist()],
+            centroid_x=shapely.get_x(centroids),
+            centroid_y=shapely.get_y(centroids)
+        )[['tile_id', 'apartment', 'room_id', 'room_name', 'tile_index', 'area', 'width', 'height', 'perimeter',
+           'compactness', 'type', 'is_split', 'part_index', 'orientation', 'centroid_x', 'centroid_y']]
         
         # Calculate basic statistics
         total_tiles = len(tiles_df)
@@ -0,0 +1,252 @@
+import numpy as np
+import pandas as pd
+import shapely
+
+from processors.geometry_utils import rotate_geometries
+
+class TileSet:
+    """Columnar (struct-of-arrays) store for tiles.
+
+    Scalar tile attributes are numpy columns and the tile and layout polygons
+    are Shapely geometry arrays, so measurements run as array operations
+    instead of per-tile Python loops. Tiles can still be exchanged as the
+    list-of-dicts format used in apartments_data (from_tiles / to_tiles).
+    """
+
+    # Numeric columns and their dtypes
+    COLUMNS = {
+        'tile_id': np.int64,
+        'room_id': np.int64,
+        'tile_index': np.int64,
+        'centroid_x': np.float64,
+        'centroid_y': np.float64,
+        'grid_col': np.int32,
+        'grid_row': np.int32,
+        'width': np.float64,
+        'height': np.float64,
+        'actual_tile_width': np.float64,
+        'actual_tile_height': np.float64,
+        'area': np.float64,
+        'type_code': np.int8,
+        'orientation': np.float64,
+        'grout_thickness': np.float64,
+        'is_start_tile': np.bool_,
+    }
+
+    # Tile 'type' values stored as small integer codes (split types come from step 4)
+    TYPE_CODES = {'full': 0, 'cut': 1, 'split': 2, 'split_cut': 3}
+    TYPE_NAMES = np.array(['full', 'cut', 'split', 'split_cut'], dtype=object)
+
+    def __init__(self, columns=None, polygons=None, layout_polygons=None, apartment_names=None):
+        columns = columns or {}
+        n = len(polygons) if polygons is not None else 0
+        self.columns = {}
+        for name, dtype in self.COLUMNS.items():
+            values = columns.get(name)
+            self.columns[name] = (np.asarray(values, dtype=dtype) if values is not None
+                                  else np.zeros(n, dtype=dtype))
+        if columns.get('tile_id') is None:
+            self.columns['tile_id'] = np.arange(n, dtype=np.int64)
+        self.polygons = np.asarray(polygons if polygons is not None else [], dtype=object)
+        self.layout_polygons = (np.asarray(layout_polygons, dtype=object) if layout_polygons is not None
+                                else self.polygons)
+        # Apartment of each tile (object column, only set when built from apartments_data)
+        self.apartment_names = (np.asarray(apartment_names, dtype=object) if apartment_names is not None
+                                else np.full(n, None, dtype=object))
+
+    def __len__(self):
+        return len(self.polygons)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @classmethod
+    def from_tiles(cls, tiles, apartment_name=None):
+        """Build from a list of tile dicts as produced by generate_tile_grid"""
+        n = len(tiles)
+        polygons = np.empty(n, dtype=object)
+        layout_polygons = np.empty(n, dtype=object)
+        polygons[:] = [tile.get('polygon') for tile in tiles]
+        layout_polygons[:] = [tile.get('layout_polygon', tile.get('polygon')) for tile in tiles]
+
+        def column(key, default, dtype):
+            return np.fromiter((tile.get(key, default) for tile in tiles), dtype=dtype, count=n)
+
+        centroids = np.array([tile.get('centroid', (np.nan, np.nan)) for tile in tiles],
+                             dtype=np.float64).reshape(n, 2)
+        grid_positions = np.array([tile.get('grid_position', (0, 0)) for tile in tiles],
+                                  dtype=np.int32).reshape(n, 2)
+        columns = {
+            'room_id': column('room_id', -1, np.int64),
+            'tile_index': np.arange(n, dtype=np.int64),
+            'centroid_x': centroids[:, 0],
+            'centroid_y': centroids[:, 1],
+            'grid_col': grid_positions[:, 0],
+            'grid_row': grid_positions[:, 1],
+            'width': column('width', 0, np.float64),
+            'height': column('height', 0, np.float64),
+            'actual_tile_width': column('actual_tile_width', 0, np.float64),
+            'actual_tile_height': column('actual_tile_height', 0, np.float64),
+            'area': column('area', np.nan, np.float64),
+            'type_code': np.fromiter((cls.TYPE_CODES.get(tile.get('type'), 1) for tile in tiles),
+                                     dtype=np.int8, count=n),
+            'orientation': column('orientation', 0, np.float64),
+            'grout_thickness': column('grout_thickness', 0, np.float64),
+            'is_start_tile': column('is_start_tile', False, np.bool_),
+        }
+
+        # Areas missing from older tile dicts are measured in one call
+        missing = np.isnan(columns['area'])
+        if missing.any():
+            columns['area'][missing] = shapely.area(polygons[missing])
+
+        return cls(columns, polygons, layout_polygons, np.full(n, apartment_name, dtype=object))
+
+    @classmethod
+    def from_apartments(cls, apartments_data):
+        """All tiles of apartments_data in one set; tile_index is the index within its apartment"""
+        parts = []
+        for apt_name, apt_data in apartments_data.items():
+            tile_set = cls.from_tiles(apt_data['tiles'], apartment_name=apt_name)
+            tile_set.columns['orientation'][:] = apt_data['orientation']
+            parts.append(tile_set)
+        return cls.concat(parts)
+
+    @classmethod
+    def from_dataframe(cls, tiles_df):
+        """Geometry-only view of a tiles DataFrame (e.g. step 5 tiles_df) for array measurements"""
+        polygons = np.empty(len(tiles_df) if 'polygon' in tiles_df else 0, dtype=object)
+        if 'polygon' in tiles_df:
+            # Missing values (NaN after concatenating frames) become None
+            polygons[:] = [p if isinstance(p, shapely.Geometry) else None for p in tiles_df['polygon']]
+        apartment_names = tiles_df['apartment_name'].to_numpy(dtype=object) if 'apartment_name' in tiles_df else None
+        return cls(polygons=polygons, apartment_names=apartment_names)
+
+    @classmethod
+    def concat(cls, tile_sets):
+        """Stack several sets; tile_id is renumbered over the result"""
+        tile_sets = [tile_set for tile_set in tile_sets if len(tile_set)]
+        if not tile_sets:
+            return cls()
+        columns = {name: np.concatenate([tile_set.columns[name] for tile_set in tile_sets])
+                   for name in cls.COLUMNS}
+        columns['tile_id'] = np.arange(len(columns['room_id']), dtype=np.int64)
+        return cls(
+            columns,
+            np.concatenate([tile_set.polygons for tile_set in tile_sets]),
+            np.concatenate([tile_set.layout_polygons for tile_set in tile_sets]),
+            np.concatenate([tile_set.apartment_names for tile_set in tile_sets])
+        )
+
+    def types(self):
+        """Decoded 'full' / 'cut' labels"""
+        return self.TYPE_NAMES[self.columns['type_code']]
+
+    def bounds(self, layout=False):
+        """(n, 4) array of minx, miny, maxx, maxy (NaN for missing geometries)"""
+        return shapely.bounds(self.layout_polygons if layout else self.polygons)
+
+    def frame_bounds(self):
+        """Bounds of each tile in its own tile frame.
+
+        Off-axis tiles are rotated back by their orientation (one transform per
+        distinct angle), so widths and heights are measured along the tile axes;
+        their bounds are rounded to 1e-6 mm to drop the rotation round-off.
+        Axis-aligned tiles are measured as they are.
+        """
+        bounds = shapely.bounds(self.polygons)
+        angles = self.columns['orientation']
+        off_axis = (angles % 90) != 0
+        for angle in np.unique(angles[off_axis]):
+            selected = off_axis & (angles == angle)
+            bounds[selected] = np.round(shapely.bounds(rotate_geometries(self.polygons[selected], -angle)), 6)
+        return bounds
+
+    def areas(self, layout=False):
+        return shapely.area(self.layout_polygons if layout else self.polygons)
+
+    def total_area(self):
+        """Summed area of the Polygon / MultiPolygon tiles"""
+        return float(self.areas()[self.polygonal()].sum())
+
+    def polygonal(self):
+        """Mask of tiles whose polygon is a Polygon or MultiPolygon"""
+        return np.isin(shapely.get_type_id(self.polygons), [3, 6])
+
+    def side_counts(self):
+        """Number of sides of each tile (largest part for MultiPolygons, 0 otherwise)"""
+        sides = np.zeros(len(self), dtype=np.int64)
+        mask = self.polygonal()
+        if not mask.any():
+            return sides
+        parts, owner = shapely.get_parts(self.polygons[mask], return_index=True)
+        # Largest part of each tile: sort by owner, then by descending area, keep the first
+        order = np.lexsort((-shapely.area(parts), owner))
+        owner_sorted = owner[order]
+        first = order[np.r_[True, owner_sorted[1:] != owner_sorted[:-1]]]
+        ring_sizes = shapely.get_num_coordinates(shapely.get_exterior_ring(parts[first])) - 1
+        sides[np.flatnonzero(mask)[owner[first]]] = ring_sizes
+        return sides
+
+    def exterior_rings(self, layout=False):
+        """Exterior coordinates of every polygon part, for drawing with a PolyCollection.
+
+        Returns (rings, owner): a list of (k, 2) arrays and the tile position of each ring.
+        """
+        geoms = self.layout_polygons if layout else self.polygons
+        valid = np.flatnonzero(np.isin(shapely.get_type_id(geoms), [3, 6]))
+        parts, owner = shapely.get_parts(geoms[valid], return_index=True)
+        keep = shapely.is_valid(parts) & ~shapely.is_empty(parts)
+        parts, owner = parts[keep], valid[owner[keep]]
+        coords, ring_index = shapely.get_coordinates(shapely.get_exterior_ring(parts), return_index=True)
+        splits = np.flatnonzero(np.diff(ring_index)) + 1
+        return np.split(coords, splits) if len(coords) else [], owner
+
+    @staticmethod
+    def _sizes(values):
+        """Float column as a list with whole values as ints, like generate_tile_grid stores sizes"""
+        whole = values == np.floor(values)
+        if whole.all():
+            return values.astype(np.int64).tolist()
+        sizes = values.tolist()
+        for i in np.flatnonzero(whole).tolist():
+            sizes[i] = int(sizes[i])
+        return sizes
+
+    def to_dataframe(self, include_geometry=True):
+        """pandas view over the columns (numpy arrays are shared, not copied)"""
+        data = dict(self.columns)
+        data['apartment_name'] = self.apartment_names
+        if include_geometry:
+            data['polygon'] = self.polygons
+            data['layout_polygon'] = self.layout_polygons
+        return pd.DataFrame(data, copy=False)
+
+    def to_tiles(self):
+        """List of tile dicts in the generate_tile_grid format"""
+        c = {name: values.tolist() for name, values in self.columns.items()}
+        for name in ['width', 'height', 'actual_tile_width', 'actual_tile_height', 'orientation', 'grout_thickness']:
+            c[name] = self._sizes(self.columns[name])
+        return [{
+            'polygon': polygon,
+            'layout_polygon': layout_polygon,
+            'room_id': room_id,
+            'width': width,
+            'height': height,
+            'actual_tile_width': actual_tile_width,
+            'actual_tile_height': actual_tile_height,
+            'centroid': (centroid_x, centroid_y),
+            'area': area,
+            'type': tile_type,
+            'orientation': orientation,
+            'grout_thickness': grout_thickness,
+            'is_start_tile': is_start_tile,
+            'grid_position': (grid_col, grid_row)
+        } for (polygon, layout_polygon, room_id, width, height, actual_tile_width, actual_tile_height,
+               centroid_x, centroid_y, area, tile_type, orientation, grout_thickness, is_start_tile,
+               grid_col, grid_row) in zip(
+            self.polygons.tolist(), self.layout_polygons.tolist(), c['room_id'], c['width'], c['height'],
+            c['actual_tile_width'], c['actual_tile_height'], c['centroid_x'], c['centroid_y'], c['area'],
+            self.types().tolist(), c['orientation'], c['grout_thickness'], c['is_start_tile'],
+            c['grid_col'], c['grid_row']
+        )]
@@ -1,16 +1,34 @@
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+import functools
+import threading
 import random
 from shapely.geometry import Polygon, MultiPolygon
 import numpy as np
 from matplotlib.patches import Polygon as MplPolygon
+from matplotlib.collections import PolyCollection
 import matplotlib.patches as patches
 import io
 import base64
 import pandas as pd
+import shapely
 
 from processors.utility_functions import display_dataframe
+from processors.TileSet import TileSet
+
+# pyplot draws on one global "current figure" shared by all threads. Methods that draw
+# through it hold this lock, and so do callers that save a figure such a method left open.
+PLOT_LOCK = threading.RLock()
+
+def pyplot_locked(method):
+    """Run a plotting method while holding PLOT_LOCK"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with PLOT_LOCK:
+            return method(*args, **kwargs)
+    return wrapper
 
 class VisualizationProcessor:
     def __init__(self):
@@ -18,27 +36,33 @@ class VisualizationProcessor:
         self.apartment_names = {}
 
     def plot_room_boundaries(self, rooms, start_points=None):
-        plt.figure(figsize=(12, 12))
+        # Own Figure (not pyplot's current figure), so concurrent uploads can draw at the same time
+        fig = Figure(figsize=(12, 12))
+        ax = fig.subplots()
         for room in rooms:
             x, y = room.exterior.xy
-            plt.plot(x, y, color='blue', linewidth=1.5)
+            ax.plot(x, y, color='blue', linewidth=1.5)
+            # Holes (columns, shafts) inside the room
+            for interior in room.interiors:
+                x, y = interior.xy
+                ax.plot(x, y, color='blue', linewidth=1.0, linestyle='--')
         if start_points:
             for sp in start_points:
                 cx, cy = sp['centroid']
-                plt.plot(cx, cy, 'ro', markersize=8)
-                plt.text(cx, cy, 'SP', fontsize=8, ha='center', color='red')
-        plt.title("📐 Room Boundaries with Tile Start Points")
-        plt.grid(True)
+                ax.plot(cx, cy, 'ro', markersize=8)
+                ax.text(cx, cy, 'SP', fontsize=8, ha='center', color='red')
+        ax.set_title("📐 Room Boundaries with Tile Start Points")
+        ax.grid(True)
         
         # Convert plot to base64 string
         buf = io.BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight')
-        plt.close()
+        fig.savefig(buf, format='png', bbox_inches='tight')
         buf.seek(0)
         return base64.b64encode(buf.read()).decode('utf-8')
 
     def plot_clusters(self, clusters_df, use_final_names=False):
-        plt.figure(figsize=(14, 14))
+        fig = Figure(figsize=(14, 14))
+        ax = fig.subplots()
         unique_clusters = clusters_df['apartment_cluster'].unique()
 
         if use_final_names and 'apartment_name' in clusters_df.columns:
@@ -54,16 +78,15 @@ class VisualizationProcessor:
             for idx, row in cluster_rooms.iterrows():
                 polygon = row['polygon']
                 x, y = polygon.exterior.xy
-                plt.fill(x, y, alpha=0.6, label=apt_name if idx == cluster_rooms.index[0] else "", color=color)
-                plt.text(row['centroid_x'], row['centroid_y'], row['room_name'], fontsize=8, ha='center', color='black')
-        plt.title("🏢 Apartment Clusters with Room Names")
-        plt.legend()
-        plt.grid(True)
+                ax.fill(x, y, alpha=0.6, label=apt_name if idx == cluster_rooms.index[0] else "", color=color)
+                ax.text(row['centroid_x'], row['centroid_y'], row['room_name'], fontsize=8, ha='center', color='black')
+        ax.set_title("🏢 Apartment Clusters with Room Names")
+        ax.legend()
+        ax.grid(True)
         
         # Convert plot to base64 string
         buf = io.BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight')
-        plt.close()
+        fig.savefig(buf, format='png', bbox_inches='tight')
         buf.seek(0)
         return base64.b64encode(buf.read()).decode('utf-8')
 
@@ -72,6 +95,7 @@ class VisualizationProcessor:
             self.colors[cluster_id] = (random.random(), random.random(), random.random())
         return self.colors[cluster_id]
 
+    @pyplot_locked
     def create_grout_outline_visualization(self, apartments_data, room_df=None):
         """Creates visualization with white grout lines between tiles"""
         print("\n🎨 Creating visualization with white grout lines...")
@@ -91,36 +115,24 @@ class VisualizationProcessor:
                          f"{room['apartment_name']}-{room['room_name']}",
                          fontsize=10, ha='center', va='center')
         
+        # Draw all tiles as two PolyCollections from a columnar TileSet instead of one fill per tile
+        tile_set = TileSet.from_apartments(apartments_data)
+        ax = plt.gca()
+        
         # First, plot layout tiles (with grout) in white to create grout lines
-        for apt_name, apt_data in apartments_data.items():
-            for tile in apt_data['tiles']:
-                layout_poly = tile.get('layout_polygon', tile['polygon'])
-                if isinstance(layout_poly, Polygon) and layout_poly.is_valid and not layout_poly.is_empty:
-                    x, y = layout_poly.exterior.xy
-                    plt.fill(x, y, color='white', edgecolor='none')
-                elif isinstance(layout_poly, MultiPolygon):
-                    for part in layout_poly.geoms:
-                        if part.is_valid and not part.is_empty:
-                            x, y = part.exterior.xy
-                            plt.fill(x, y, color='white', edgecolor='none')
+        layout_rings, _ = tile_set.exterior_rings(layout=True)
+        ax.add_collection(PolyCollection(layout_rings, facecolors='white', edgecolors='none'))
         
         # Then, plot actual tiles (factory size) with apartment colors
-        rendered_tiles = 0
-        for apt_name, apt_data in apartments_data.items():
-            color = apartment_colors[apt_name]
-            
-            for tile in apt_data['tiles']:
-                poly = tile['polygon']
-                if isinstance(poly, Polygon) and poly.is_valid and not poly.is_empty:
-                    x, y = poly.exterior.xy
-                    plt.fill(x, y, color=color, edgecolor='black', linewidth=0.2)
-                    rendered_tiles += 1
-                elif isinstance(poly, MultiPolygon):
-                    for part in poly.geoms:
-                        if part.is_valid and not part.is_empty:
-                            x, y = part.exterior.xy
-                            plt.fill(x, y, color=color, edgecolor='black', linewidth=0.2)
-                    rendered_tiles += 1
+        tile_rings, ring_owner = tile_set.exterior_rings()
+        tile_colors = [apartment_colors[apt_name] for apt_name in tile_set.apartment_names[ring_owner]]
+        ax.add_collection(PolyCollection(tile_rings, facecolors=tile_colors, edgecolors='black', linewidths=0.2))
+        ax.autoscale_view()
+        
+        # Valid Polygons and all MultiPolygons count as rendered
+        type_ids = shapely.get_type_id(tile_set.polygons)
+        valid_polygons = (type_ids == 3) & shapely.is_valid(tile_set.polygons) & ~shapely.is_empty(tile_set.polygons)
+        rendered_tiles = int(valid_polygons.sum() + (type_ids == 6).sum())
         
         total_tiles = sum(len(apt_data['tiles']) for apt_name, apt_data in apartments_data.items())
         print(f"Total tiles: {total_tiles}, Rendered tiles: {rendered_tiles}")
@@ -144,6 +156,7 @@ class VisualizationProcessor:
         
         return base64.b64encode(buf.read()).decode('utf-8')
 
+    @pyplot_locked
     def visualize_classification(self, tiles_df, final_room_df, has_pattern=False, with_grout=True):
         """Optimized visualization of classified tiles"""
         print(f"\n🎨 Visualizing classified tiles...")
@@ -218,6 +231,7 @@ class VisualizationProcessor:
         
         return classification_counts
 
+    @pyplot_locked
     def visualize_multipolygons_in_detail(self, apartments_data, mp_df, final_room_df):
         """Create a detailed visualization of MultiPolygon tiles only"""
         if mp_df.empty:
@@ -318,6 +332,7 @@ class VisualizationProcessor:
         buf.seek(0)
         return base64.b64encode(buf.read()).decode('utf-8')
 
+    @pyplot_locked
     def visualize_all_tiles_highlighting_multipolygons(self, apartments_data, mp_df, final_room_df):
         """Create a visualization of ALL tiles with MultiPolygons highlighted"""
         print("\n🔍 Creating visualization of all tiles with MultiPolygons highlighted...")
@@ -398,6 +413,7 @@ class VisualizationProcessor:
         buf.seek(0)
         return base64.b64encode(buf.read()).decode('utf-8')
 
+    @pyplot_locked
     def visualize_split_results(self, apartments_data, split_data, mp_df, final_room_df):
         """Create a visualization comparing original MultiPolygons with split tiles"""
         if mp_df.empty:
@@ -510,6 +526,7 @@ class VisualizationProcessor:
         buf.seek(0)
         return base64.b64encode(buf.read()).decode('utf-8')
 
+    @pyplot_locked
     def visualize_all_tiles_after_splitting(self, split_data, mp_df, final_room_df):
         """Create a visualization of ALL tiles after splitting MultiPolygons"""
         print("\n🔍 Creating visualization of all tiles after splitting MultiPolygons...")
@@ -591,6 +608,7 @@ class VisualizationProcessor:
         
         return split_count, regular_count
 
+    @pyplot_locked
     def visualize_all_tiles_highlighting_small(self, apartments_data, small_tiles, final_room_df, area_threshold):
         """Create a visualization of all tiles with small tiles highlighted"""
         print("\n🔍 Creating visualization with small tiles highlighted...")
@@ -674,6 +692,7 @@ class VisualizationProcessor:
         # Don't show the plot - let the caller handle it
         return small_count, regular_count
 
+    @pyplot_locked
     def visualize_small_tiles(self, tiles_df, small_tiles_df, final_room_df, size_threshold=10):
         """Visualize small cut tiles in context of all tiles"""
         print(f"\n🎨 Visualizing tiles with cut dimension < {size_threshold}mm...")
@@ -785,6 +804,7 @@ class VisualizationProcessor:
         # Don't show - let the caller handle it
         return True
 
+    @pyplot_locked
     def visualize_apartment_tiles(self, apartment_name, tiles_subset, rooms_subset, group_mapping, tile_specs_to_groups, tile_width, tile_height, get_tile_color_func):
         """Create visualization for a specific apartment with matching colors"""
         fig, ax = plt.subplots(figsize=(16, 16))
@@ -967,6 +987,7 @@ class VisualizationProcessor:
         
         return match_type_counts
     
+    @pyplot_locked
     def plot_clusters_with_positions(self, clusters_df, use_final_names=False):
         """FINAL VERSION - Correct positioning using start points and proper scale"""
         import matplotlib.pyplot as plt
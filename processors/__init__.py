@@ -1,6 +1,6 @@
 # processors/__init__.py
 # Make the processor classes available at the package level
-from processors.CustomDxfProcessor import CustomDxfProcessor
+from processors.CustomDxfProcessor import CustomDxfProcessor, DxfOptions, DxfExtraction, parse_dxf
 from processors.VisualizationProcessor import VisualizationProcessor
 from processors.RoomClusterProcessor import RoomClusterProcessor
 from processors.TileProcessor import TileProcessor
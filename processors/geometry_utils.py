@@ -1,4 +1,6 @@
 # processors/geometry_utils.py
+import numpy as np
+import shapely
 from shapely.geometry import Polygon
 
 def get_bounding_box(polygon):
@@ -8,4 +10,43 @@ def get_bounding_box(polygon):
 
 def get_tile_centroid(tile_polygon):
     """Get the centroid of a tile polygon"""
-    return tile_polygon.centroid
\ No newline at end of file
+    return tile_polygon.centroid
+
+def int_if_whole(value):
+    """A number as int when it is whole (600.0 -> 600), as float otherwise"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+def normalize_orientation(orientation):
+    """Map a tile angle in degrees to [0, 180): a rectangular grid turned by 180° is the same grid.
+
+    So 270° and -90° become 90° and 180° becomes 0°; whole numbers come back as ints.
+    """
+    return int_if_whole(float(orientation) % 180)
+
+def is_axis_aligned(orientation):
+    """True for orientations handled by swapping tile width and height (multiples of 90°)"""
+    return float(orientation) % 90 == 0
+
+def rotate_geometries(geoms, angle, origin=(0, 0)):
+    """Rotate a geometry or array of geometries counter-clockwise by angle (degrees) about origin.
+
+    One affine transform is applied to all coordinates at once, instead of
+    calling shapely.affinity.rotate per geometry.
+    """
+    theta = np.radians(angle)
+    c, s = np.cos(theta), np.sin(theta)
+    matrix = np.array([[c, -s], [s, c]])
+    ox, oy = origin
+    offset = np.array([ox, oy])
+    return shapely.transform(geoms, lambda coords: (coords - offset) @ matrix.T + offset)
+
+def mirror_translate_geometries(geoms, flip=(1, 1), offset=(0, 0)):
+    """Map (x, y) to (flip_x * x + dx, flip_y * y + dy) for a geometry or array of geometries.
+
+    flip entries are 1 or -1 (-1 mirrors across that axis); like rotate_geometries
+    this is one transform over all coordinates.
+    """
+    scale = np.asarray(flip, dtype=float)
+    shift = np.asarray(offset, dtype=float)
+    return shapely.transform(geoms, lambda coords: coords * scale + shift)
@@ -0,0 +1,103 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+import shapely
+
+
+class DxfCache:
+    """On-disk cache of parsed DXF results, keyed by file hash and extraction parameters"""
+
+    # Bump when the extraction pipeline changes so stale entries are ignored
+    FORMAT_VERSION = 2
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, file_hash, params):
+        """Combine the file hash with the extraction parameters into a cache key"""
+        payload = json.dumps({'file_hash': file_hash, 'params': params,
+                              'version': self.FORMAT_VERSION}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    @staticmethod
+    def _pack_geometries(geometries):
+        """Concatenate WKB blobs into one byte array plus offsets"""
+        blobs = [shapely.to_wkb(geom) for geom in geometries]
+        offsets = np.cumsum([0] + [len(blob) for blob in blobs]).astype(np.int64)
+        data = np.frombuffer(b''.join(blobs), dtype=np.uint8)
+        return data, offsets
+
+    @staticmethod
+    def _unpack_geometries(data, offsets):
+        raw = data.tobytes()
+        return [shapely.from_wkb(raw[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+
+    def get(self, file_hash, params):
+        """Return the cached extraction dict, or None on a miss"""
+        path = self._path(self.make_key(file_hash, params))
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                rooms = self._unpack_geometries(data['room_wkb'], data['room_offsets'])
+                sp_polys = self._unpack_geometries(data['sp_wkb'], data['sp_offsets'])
+                sp_values = data['sp_values']
+                tile_sizes = [tuple(size) for size in data['tile_sizes'].tolist()]
+                meta = json.loads(str(data['meta']))
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable DXF cache entry {path}: {e}")
+            return None
+
+        start_points = []
+        for poly, (cx, cy, width, height, area, room_id) in zip(sp_polys, sp_values.tolist()):
+            start_points.append({
+                'polygon': poly,
+                'centroid': (cx, cy),
+                'width': width,
+                'height': height,
+                'area': area,
+                'room_id': int(room_id)
+            })
+
+        print(f"⚡ DXF cache hit: {len(rooms)} rooms, {len(start_points)} starting points")
+        return {
+            'rooms': rooms,
+            'start_points': start_points,
+            'tile_sizes': tile_sizes,
+            'meta': meta
+        }
+
+    def put(self, file_hash, params, rooms, start_points, tile_sizes, meta=None):
+        """Store an extraction result (written atomically)"""
+        room_wkb, room_offsets = self._pack_geometries(rooms)
+        sp_wkb, sp_offsets = self._pack_geometries([sp['polygon'] for sp in start_points])
+        sp_values = np.array([
+            [sp['centroid'][0], sp['centroid'][1], sp['width'], sp['height'],
+             sp['area'], sp.get('room_id', -1)]
+            for sp in start_points
+        ], dtype=float).reshape(-1, 6)
+
+        path = self._path(self.make_key(file_hash, params))
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(
+                    f,
+                    room_wkb=room_wkb, room_offsets=room_offsets,
+                    sp_wkb=sp_wkb, sp_offsets=sp_offsets, sp_values=sp_values,
+                    tile_sizes=np.array(tile_sizes, dtype=float).reshape(-1, 2),
+                    meta=np.array(json.dumps(meta or {}))
+                )
+            os.replace(tmp_path, path)
+            print(f"💾 Cached DXF extraction ({os.path.getsize(path) / 1024:.1f} KB)")
+        except Exception as e:
+            print(f"⚠️ Could not write DXF cache entry: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -9,10 +9,10 @@ class SessionDataManager:
     
     # Define which session keys belong to each step
     STEP_SESSION_KEYS = {
-        1: ['rooms_data', 'start_points_data', 'tile_sizes', 'cluster_plot', 
-            'room_df', 'room_polygons', 'uploaded_file'],
+        1: ['rooms_data', 'start_points_data', 'tile_sizes', 'cluster_plot', 'revision_reuse',
+            'room_df', 'room_polygons', 'uploaded_file', 'cluster_analysis'],
         2: ['final_room_df', 'apartments_data', 'apartment_orientations'],
-        3: ['apartments_data', 'apartment_orientations'],
+        3: ['apartments_data', 'apartment_orientations', 'tile_config', 'start_offsets'],
         4: ['tile_analysis_results', 'apartments_data'],
         5: ['tile_classification_results', 'tile_analysis_results'],
         6: ['small_tiles_results', 'tile_polygon_mapping', 'tiles_remaining', 'small_tiles_removed'],
@@ -0,0 +1,166 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import shapely
+
+from processors.TileSet import TileSet
+
+
+class TileCache:
+    """LRU cache of room tilings for one project, persisted as one .npz file.
+
+    Keys are TileProcessor.room_layout_key hashes (room shape, start point and
+    layout parameters, independent of where the room is drawn); each entry
+    keeps the tiles of the room they were laid in plus that room's frame, so
+    they can be placed on any room with the same key. Entries are kept in
+    their packed form (numeric columns plus WKB) and only decoded when they
+    are hit.
+    """
+
+    # Bump when tiling changes so stale entries are ignored
+    FORMAT_VERSION = 2
+
+    def __init__(self, cache_dir, project_id, max_entries=2000):
+        self.cache_dir = cache_dir
+        self.project_id = project_id
+        self.max_entries = max_entries
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._entries = None  # key -> packed entry, least recently used first
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _path(self):
+        return os.path.join(self.cache_dir, f"{self.project_id}.npz")
+
+    @staticmethod
+    def _pack(tiles, frame):
+        tile_set = TileSet.from_tiles(tiles)
+        return {
+            'frame': tuple(frame),
+            'columns': {name: values for name, values in tile_set.columns.items() if name != 'tile_id'},
+            'polygon_wkb': shapely.to_wkb(tile_set.polygons),
+            'layout_wkb': shapely.to_wkb(tile_set.layout_polygons)
+        }
+
+    @staticmethod
+    def _unpack(entry):
+        tile_set = TileSet(entry['columns'], shapely.from_wkb(entry['polygon_wkb']),
+                           shapely.from_wkb(entry['layout_wkb']))
+        return tile_set.to_tiles()
+
+    @staticmethod
+    def _join_wkb(blobs):
+        offsets = np.cumsum([0] + [len(blob) for blob in blobs]).astype(np.int64)
+        return np.frombuffer(b''.join(blobs), dtype=np.uint8), offsets
+
+    @staticmethod
+    def _split_wkb(data, offsets):
+        raw = data.tobytes()
+        blobs = np.empty(len(offsets) - 1, dtype=object)
+        blobs[:] = [raw[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        return blobs
+
+    def _load(self):
+        """Read the project's entries from disk (once)"""
+        if self._entries is not None:
+            return self._entries
+        self._entries = OrderedDict()
+        path = self._path()
+        if not os.path.exists(path):
+            return self._entries
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data['version']) != self.FORMAT_VERSION:
+                    return self._entries
+                keys = data['keys'].tolist()
+                frames = data['frames'].tolist()
+                bounds = np.concatenate([[0], np.cumsum(data['tile_counts'])])
+                columns = {name: data[f"col_{name}"] for name in TileSet.COLUMNS if name != 'tile_id'}
+                polygon_wkb = self._split_wkb(data['polygon_wkb'], data['polygon_offsets'])
+                layout_wkb = self._split_wkb(data['layout_wkb'], data['layout_offsets'])
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable tile cache {path}: {e}")
+            return self._entries
+
+        for key, frame, start, stop in zip(keys, frames, bounds[:-1], bounds[1:]):
+            self._entries[key] = {
+                'frame': tuple(frame),
+                'columns': {name: values[start:stop] for name, values in columns.items()},
+                'polygon_wkb': polygon_wkb[start:stop],
+                'layout_wkb': layout_wkb[start:stop]
+            }
+        print(f"📂 Loaded tile cache for project {self.project_id}: {len(keys)} rooms")
+        return self._entries
+
+    def get(self, key):
+        """(tiles, frame) for a key (fresh tile dicts), or None on a miss"""
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self._dirty = True
+        return self._unpack(entry), entry['frame']
+
+    def put(self, key, tiles, frame):
+        """Store the tiles of one room and its frame, evicting the least recently used rooms"""
+        entry = self._pack(tiles, frame)
+        with self._lock:
+            entries = self._load()
+            entries[key] = entry
+            entries.move_to_end(key)
+            self._evict()
+            self._dirty = True
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def save(self):
+        """Write the entries in LRU order (atomically) if anything changed"""
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            self._evict()
+            entries = list(self._entries.items())
+            self._dirty = False
+
+        path = self._path()
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            arrays = {
+                f"col_{name}": np.concatenate([entry['columns'][name] for _, entry in entries]
+                                              or [np.zeros(0, dtype=dtype)]).astype(dtype)
+                for name, dtype in TileSet.COLUMNS.items() if name != 'tile_id'
+            }
+            arrays['polygon_wkb'], arrays['polygon_offsets'] = self._join_wkb(
+                [blob for _, entry in entries for blob in entry['polygon_wkb']]
+            )
+            arrays['layout_wkb'], arrays['layout_offsets'] = self._join_wkb(
+                [blob for _, entry in entries for blob in entry['layout_wkb']]
+            )
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(
+                    f,
+                    version=np.array(self.FORMAT_VERSION),
+                    keys=np.array([key for key, _ in entries], dtype='U64'),
+                    frames=np.array([entry['frame'] for _, entry in entries], dtype=float).reshape(-1, 4),
+                    tile_counts=np.array([len(entry['polygon_wkb']) for _, entry in entries], dtype=np.int64),
+                    **arrays
+                )
+            os.replace(tmp_path, path)
+            print(f"💾 Saved tile cache: {len(entries)} rooms ({os.path.getsize(path) / 1024:.1f} KB)")
+        except Exception as e:
+            print(f"⚠️ Could not write tile cache: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def clear(self):
+        """Drop the project's cache (e.g. when the project is deleted)"""
+        with self._lock:
+            self._entries = OrderedDict()
+            self._dirty = False
+        if os.path.exists(self._path()):
+            os.remove(self._path())